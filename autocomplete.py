@@ -0,0 +1,22 @@
+import logging
+import discord
+
+# Discord shows at most this many autocomplete choices
+MAX_CHOICES = 25
+
+# Discord's error code for an interaction answered after its 3 second deadline
+UNKNOWN_INTERACTION = 10062
+
+class ExpiredAutocompleteFilter(logging.Filter):
+    """
+    Drops the command tree's log records for autocomplete answers Discord rejected as
+    expired. Those happen on every keystroke the user types past a slow answer.
+    """
+
+    def filter(self, record):
+        error = record.exc_info[1] if record.exc_info else None
+        return not (isinstance(error, discord.NotFound) and error.code == UNKNOWN_INTERACTION)
+
+def quiet_expired_autocomplete():
+    """Install ExpiredAutocompleteFilter on discord.py's command tree logger."""
+    logging.getLogger("discord.app_commands.tree").addFilter(ExpiredAutocompleteFilter())
@@ -0,0 +1,139 @@
+import time
+from collections import OrderedDict
+import pytz
+from config import (
+    DM_CHANNEL_CACHE_SIZE,
+    DM_CHANNEL_CACHE_TTL_SECONDS,
+    PROFILE_CACHE_SIZE,
+    PROFILE_CACHE_TTL_SECONDS,
+)
+
+_MISSING = object()
+
+class TTLCache:
+    """Bounded LRU cache whose entries also expire after `ttl` seconds."""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()  # key -> (expires_at, value), least recently used first
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default=None):
+        entry = self._data.get(key, _MISSING)
+        if entry is not _MISSING:
+            expires_at, value = entry
+            if expires_at > time.monotonic():
+                self._data.move_to_end(key)
+                self.hits += 1
+                return value
+            del self._data[key]
+        self.misses += 1
+        return default
+
+    def set(self, key, value):
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key):
+        entry = self._data.pop(key, None)
+        return entry[1] if entry else None
+
+    def clear(self):
+        self._data.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+        }
+
+class DMChannelCache:
+    """Resolves user ids to DM channels without a REST round trip per reminder.
+
+    Lookups try the resolved-channel cache, then the client's local user cache,
+    and only fall back to `fetch_user` on a miss. The opened DM channel is kept
+    so later sends skip both the user lookup and `create_dm`.
+    """
+
+    def __init__(self, aurabot, maxsize=DM_CHANNEL_CACHE_SIZE, ttl=DM_CHANNEL_CACHE_TTL_SECONDS):
+        self.aurabot = aurabot
+        self._channels = TTLCache(maxsize, ttl)
+        self.local_user_hits = 0
+        self.rest_user_fetches = 0
+
+    async def get(self, user_id):
+        channel = self._channels.get(user_id)
+        if channel is not None:
+            return channel
+
+        user = self.aurabot.get_user(user_id)
+        if user is not None:
+            self.local_user_hits += 1
+        else:
+            user = await self.aurabot.fetch_user(user_id)
+            self.rest_user_fetches += 1
+
+        channel = user.dm_channel or await user.create_dm()
+        self._channels.set(user_id, channel)
+        return channel
+
+    def invalidate(self, user_id):
+        self._channels.pop(user_id)
+
+    def stats(self):
+        stats = self._channels.stats()
+        stats["local_user_hits"] = self.local_user_hits
+        stats["rest_user_fetches"] = self.rest_user_fetches
+        return stats
+
+class ProfileCache:
+    """Read-through cache of `user_profiles` documents with their timezone objects.
+
+    Profiles almost never change, so commands read them from here instead of
+    MongoDB. Missing profiles are cached too. Anything that writes a profile
+    must call `invalidate`; the TTL only bounds staleness from other processes.
+    """
+
+    def __init__(self, db, maxsize=PROFILE_CACHE_SIZE, ttl=PROFILE_CACHE_TTL_SECONDS):
+        self.collection = db.user_profiles
+        self._profiles = TTLCache(maxsize, ttl)  # user id -> (profile or None, tzinfo)
+
+    async def _load(self, user_id):
+        entry = self._profiles.get(user_id)
+        if entry is None:
+            profile = await self.collection.find_one({"_id": user_id})
+            entry = (profile, self._timezone(profile))
+            self._profiles.set(user_id, entry)
+        return entry
+
+    @staticmethod
+    def _timezone(profile):
+        try:
+            return pytz.timezone((profile or {}).get("timezone") or "UTC")
+        except pytz.UnknownTimeZoneError:
+            return pytz.utc
+
+    async def get(self, user_id):
+        """The user's profile, or None if they haven't created one."""
+        profile, _ = await self._load(user_id)
+        return profile
+
+    async def get_with_timezone(self, user_id):
+        """(profile, tzinfo); the timezone is UTC when the profile has none."""
+        return await self._load(user_id)
+
+    def invalidate(self, user_id):
+        self._profiles.pop(user_id)
+
+    def stats(self):
+        return self._profiles.stats()
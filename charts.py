@@ -0,0 +1,124 @@
+import asyncio
+import io
+import itertools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from cache import TTLCache
+from config import CHART_WORKERS, CHART_CACHE_SIZE, CHART_CACHE_TTL_SECONDS
+
+# Chart kinds, and the data each one is drawn from
+CHART_KINDS = ("moods", "habits", "goals")
+
+def _figure(width, height):
+    # Imported in the worker process only; Agg renders straight to PNG without a display
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    fig, ax = plt.subplots(figsize=(width, height), dpi=100)
+    return plt, fig, ax
+
+def _png(plt, fig):
+    buffer = io.BytesIO()
+    fig.tight_layout()
+    fig.savefig(buffer, format="png")
+    plt.close(fig)
+    return buffer.getvalue()
+
+def render_moods(data):
+    """Line chart of daily mood scores with their 7-day rolling average."""
+    plt, fig, ax = _figure(8, 3.5)
+    days, daily, rolling = data["days"], data["daily"], data["rolling"]
+    ax.scatter(days, daily, s=12, alpha=0.5, label="Daily average")
+    ax.plot(days, rolling, linewidth=2, label="7-day average")
+    ax.set_ylim(0.5, 5.5)
+    ax.set_ylabel("Mood (1-5)")
+    ax.set_title(f"Mood over the last {len(days)} days")
+    ax.legend(loc="upper left")
+    fig.autofmt_xdate()
+    return _png(plt, fig)
+
+def render_habits(data):
+    """Heatmap of the last weeks: one row per habit, one column per day."""
+    plt, fig, ax = _figure(8, 1 + 0.4 * len(data["habits"]))
+    ax.imshow(data["grid"], aspect="auto", cmap="Greens", vmin=0, vmax=1, interpolation="nearest")
+    ax.set_yticks(range(len(data["habits"])))
+    ax.set_yticklabels([name[:30] for name in data["habits"]])
+    ticks = list(range(0, len(data["days"]), 7))
+    ax.set_xticks(ticks)
+    ax.set_xticklabels([data["days"][i] for i in ticks], rotation=45, ha="right")
+    ax.set_title(f"Habits over the last {len(data['days'])} days")
+    return _png(plt, fig)
+
+def render_goals(data):
+    """Horizontal bars of days of progress per goal, completed goals highlighted."""
+    goals = data["goals"]
+    plt, fig, ax = _figure(8, 1 + 0.4 * len(goals))
+    names = [goal["name"][:30] for goal in goals]
+    colors = ["tab:green" if goal["completed"] else "tab:blue" for goal in goals]
+    ax.barh(names, [goal["total"] for goal in goals], color=colors)
+    for i, goal in enumerate(goals):
+        label = f"{goal['total']} day(s), streak {goal['current']}"
+        if goal.get("deadline"):
+            label += f", due {goal['deadline']}"
+        ax.text(goal["total"], i, f"  {label}", va="center", fontsize=8)
+    ax.invert_yaxis()
+    ax.set_xlabel("Days with progress")
+    ax.set_title("Goal progress")
+    return _png(plt, fig)
+
+RENDERERS = {"moods": render_moods, "habits": render_habits, "goals": render_goals}
+
+class ChartRenderer:
+    """Renders chart PNGs in a process pool and caches them per user.
+
+    Matplotlib blocks for hundreds of milliseconds per chart, so rendering runs in
+    CHART_WORKERS separate processes instead of on the event loop. Images are cached
+    under (user, chart kind, data version); `invalidate` bumps the version when the
+    user's data changes. Callers read `version` before loading the chart data, so a
+    render that races with a change is cached under the old version and never served.
+    Versions come from one counter and are never reused, so a version that expires
+    from its bounded cache can't bring back an image cached under an earlier one.
+    """
+
+    def __init__(self):
+        self._executor = None
+        self._images = TTLCache(CHART_CACHE_SIZE, CHART_CACHE_TTL_SECONDS)
+        self._versions = TTLCache(CHART_CACHE_SIZE, CHART_CACHE_TTL_SECONDS)  # (user id, kind) -> data version
+        self._counter = itertools.count(1)
+
+    def _pool(self):
+        if self._executor is None:
+            # Spawned workers don't inherit the bot's event loop, sockets or threads
+            self._executor = ProcessPoolExecutor(CHART_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        return self._executor
+
+    def version(self, user_id, kind):
+        """The version of the user's `kind` data; read it before loading the data to render."""
+        version = self._versions.get((user_id, kind))
+        if version is None:
+            version = next(self._counter)
+            self._versions.set((user_id, kind), version)
+        return version
+
+    def invalidate(self, user_id, kind):
+        """Mark the user's `kind` chart stale after their data changed."""
+        self._versions.set((user_id, kind), next(self._counter))
+
+    def cached(self, user_id, kind):
+        """The cached PNG for the user's current data, or None."""
+        return self._images.get((user_id, kind, self.version(user_id, kind)))
+
+    async def render(self, user_id, kind, data, version):
+        """Render `data`, loaded at `version`, as a `kind` chart in the pool; cache it and return the PNG bytes."""
+        loop = asyncio.get_running_loop()
+        image = await loop.run_in_executor(self._pool(), RENDERERS[kind], data)
+        self._images.set((user_id, kind, version), image)
+        return image
+
+    def stats(self):
+        return self._images.stats()
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -1,92 +1,108 @@
 import discord
 from discord.ext import commands
-from pymongo import MongoClient
-from dotenv import load_dotenv
-import pytz
-import os
-from config import GUILD_ID
-
-# Load environment variables
-load_dotenv()
-
-class TimezoneDropdown(discord.ui.Select):
-    def __init__(self, user_id, profile_collection):
-        self.user_id = user_id
-        self.profile_collection = profile_collection
-
-        # Commonly used timezones (you can expand this list)
-        timezones = [
-            "US/Eastern", "US/Central", "US/Mountain", "US/Pacific",
-            "US/Alaska", "US/Hawaii"
-        ]
-
-        options = [
-            discord.SelectOption(label=tz, description=f"Timezone: {tz}")
-            for tz in timezones
-        ]
-        super().__init__(placeholder="Select your timezone...", options=options)
-
-    async def callback(self, interaction: discord.Interaction):
-        selected_timezone = self.values[0]
-        self.profile_collection.update_one(
-            {"_id": self.user_id},
-            {"$set": {"timezone": selected_timezone}},
-            upsert=True
-        )
-        await interaction.response.send_message(
-            f"Your timezone has been set to **{selected_timezone}**."
-        )
-
-class TimezoneDropdownView(discord.ui.View):
-    def __init__(self, user_id, profile_collection):
-        super().__init__()
-        self.add_item(TimezoneDropdown(user_id, profile_collection))
+from autocomplete import MAX_CHOICES
+from timeslots import refresh_mood_slot
+from timezones import timezone_index
 
 class CreateProfile(commands.Cog):
-    """Cog for creating user profiles with timezone selection."""
+    """Cog for creating user profiles and setting their timezone."""
 
     def __init__(self, aurabot):
         self.aurabot = aurabot
 
-        # MongoDB setup
-        mongo_url = os.getenv("MONGO_URL")
-        if not mongo_url:
-            raise ValueError("MongoDB connection string is not set in .env")
-
-        self.cluster = MongoClient(mongo_url)
-        self.db = self.cluster["AuraBotDB"]
-        self.profile_collection = self.db["user_profiles"]
+        # Shared MongoDB layer
+        self.profile_collection = aurabot.db.user_profiles
+        self.mood_collection = aurabot.db.mood_logging
+        self.profiles = aurabot.profiles
 
     async def cog_load(self):
         """Register commands when the cog is loaded."""
-        guild = discord.Object(id=GUILD_ID)
+        guild = self.aurabot.command_guild  # None registers the commands globally
         self.aurabot.tree.add_command(self.create_profile, guild=guild)
+        self.aurabot.tree.add_command(self.set_timezone, guild=guild)
+
+    async def apply_timezone(self, user_id, timezone_name):
+        """Store a user's timezone and update everything derived from it."""
+        await self.profile_collection.update_one(
+            {"_id": user_id},
+            {"$set": {"timezone": timezone_name}},
+            upsert=True
+        )
+        self.profiles.invalidate(user_id)
+        # Keep the mood reminder's UTC slot in step with the new timezone
+        await refresh_mood_slot(self.mood_collection, user_id, timezone_name)
 
     @discord.app_commands.command(name="createprofile", description="Create your profile with your Discord username and timezone.")
-    async def create_profile(self, interaction: discord.Interaction):
+    @discord.app_commands.describe(timezone="Your timezone, e.g. America/New_York (start typing a city or country)")
+    async def create_profile(self, interaction: discord.Interaction, timezone: str = None):
         """Handles the /createprofile command."""
         user_id = interaction.user.id
         username = interaction.user.name  # Use Discord username
 
         # Check if the user already has a profile
-        existing_profile = self.profile_collection.find_one({"_id": user_id})
+        existing_profile = await self.profiles.get(user_id)
 
         if existing_profile:
             existing_username = existing_profile.get("username", "No username set.")
             existing_timezone = existing_profile.get("timezone", "No timezone set.")
             await interaction.response.send_message(
-                f"You already have a profile:\n- **Username**: {existing_username}\n- **Timezone**: {existing_timezone}"
+                f"You already have a profile:\n- **Username**: {existing_username}\n- **Timezone**: {existing_timezone}\n"
+                f"Use `/settimezone` to change your timezone."
+            )
+            return
+
+        timezone_name = timezone_index.resolve(timezone) if timezone else None
+        if timezone and not timezone_name:
+            await interaction.response.send_message(
+                f"Unknown timezone `{timezone}`. Pick one of the suggestions while typing.", ephemeral=True
+            )
+            return
+
+        # Create a new profile with the username
+        await self.profile_collection.insert_one({"_id": user_id, "username": username})
+        self.profiles.invalidate(user_id)
+        if timezone_name:
+            await self.apply_timezone(user_id, timezone_name)
+            await interaction.response.send_message(
+                f"Your profile has been created with the username: **{username}** "
+                f"and timezone **{timezone_name}**."
             )
         else:
-            # Create a new profile with the username
-            self.profile_collection.insert_one({"_id": user_id, "username": username})
             await interaction.response.send_message(
-                f"Your profile has been created with the username: **{username}**.\nNow, select your timezone:"
+                f"Your profile has been created with the username: **{username}**.\n"
+                f"Now set your timezone with `/settimezone` (it defaults to UTC)."
             )
 
-            # Show the timezone dropdown menu
-            view = TimezoneDropdownView(user_id, self.profile_collection)
-            await interaction.followup.send(view=view)
+    @discord.app_commands.command(name="settimezone", description="Set your timezone.")
+    @discord.app_commands.describe(timezone="Your timezone, e.g. America/New_York (start typing a city or country)")
+    async def set_timezone(self, interaction: discord.Interaction, timezone: str):
+        """Handles the /settimezone command."""
+        user_id = interaction.user.id
+        if not await self.profiles.get(user_id):
+            await interaction.response.send_message(
+                "You don't have a profile yet! Use `/createprofile` to set up your profile and timezone."
+            )
+            return
+
+        timezone_name = timezone_index.resolve(timezone)
+        if not timezone_name:
+            await interaction.response.send_message(
+                f"Unknown timezone `{timezone}`. Pick one of the suggestions while typing.", ephemeral=True
+            )
+            return
+
+        await self.apply_timezone(user_id, timezone_name)
+        await interaction.response.send_message(f"Your timezone has been set to **{timezone_name}**.")
+
+    @create_profile.autocomplete("timezone")
+    @set_timezone.autocomplete("timezone")
+    async def timezone_autocomplete(self, interaction: discord.Interaction, current: str):
+        """Suggest zones from the prefix index built at startup."""
+        choices = [
+            discord.app_commands.Choice(name=zone, value=zone)
+            for zone in timezone_index.search(current)
+        ]
+        return choices[:MAX_CHOICES]
 
 # Required setup function
 async def setup(aurabot):
@@ -1,15 +1,47 @@
 import asyncio
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 import discord
 from discord.ui import View, Select
 from discord.ext import commands
-from pymongo import MongoClient
-from dotenv import load_dotenv
-import os
-from config import GUILD_ID
-
-# Load environment variables
-load_dotenv()
+from autocomplete import MAX_CHOICES
+from scheduler import next_daily_utc, utcnow
+from points import PROGRESS_AWARD, PointsLedger
+from daylog import log_day_update, migrate_string_logs, not_logged_filter
+from streaks import EMPTY_STATS, advance, backfill_stats, format_stats, item_stats, item_summaries, reset_broken_streaks
+
+# UTC time of the nightly streak repair job
+STREAK_REPAIR_TIME = "00:05"
+
+# How far ahead each deadline sweep schedules reminders; also the sweep interval
+DEADLINE_WINDOW = timedelta(hours=1)
+
+# Discord limits: select option values / labels and options per select
+MAX_NAME_LENGTH = 100
+MAX_SELECT_OPTIONS = 25
+
+class GoalSelectView(View):
+    """Goal dropdown for /updategoal.
+
+    One persistent instance (no timeout, fixed custom_id) is registered at startup
+    and handles selections from every /updategoal message, including ones sent before
+    a restart. The selected option's value is the goal name, so the view holds no
+    user data.
+    """
+
+    def __init__(self, cog, options=()):
+        super().__init__(timeout=None)
+        self.cog = cog
+        self.select = Select(
+            placeholder="Select a goal to log progress...",
+            options=list(options),
+            custom_id="aurabot:goal_select"
+        )
+        self.select.callback = self.select_callback  # Set callback for the select
+        self.add_item(self.select)
+
+    async def select_callback(self, interaction: discord.Interaction):
+        # Menus are ephemeral, so whoever selects is the user the menu was sent to
+        await self.cog.record_progress(interaction, interaction.user.id, self.select.values[0])
 
 class GoalTracking(commands.Cog):
     """Cog for tracking and logging user goals with optional deadlines and progress updates."""
@@ -17,28 +49,23 @@ class GoalTracking(commands.Cog):
     def __init__(self, aurabot):
         self.aurabot = aurabot
 
-        # MongoDB setup
-        mongo_url = os.getenv("MONGO_URL")
-        if not mongo_url:
-            raise ValueError("MongoDB connection string is not set in .env")
-
-        self.cluster = MongoClient(mongo_url)
-        self.db = self.cluster["AuraBotDB"]
-        self.collection = self.db["goal_tracking"]
-
-        print("Connected to MongoDB for goal tracking!")
-
-        # Start the reminder task
-        self.reminder_task = self.aurabot.loop.create_task(self.send_goal_reminders())
+        # Shared MongoDB layer
+        self.collection = aurabot.db.goal_tracking
+        self.points = PointsLedger(aurabot.db)
+        self.migration_task = None
 
     async def cog_unload(self):
-        """Stop the reminder task when the cog is unloaded."""
-        self.reminder_task.cancel()
+        """Drop this cog's reminders and jobs from the shared scheduler."""
+        self.aurabot.scheduler.unregister("goal")
+        self.aurabot.scheduler.unregister("goal_deadlines")
+        self.aurabot.scheduler.unregister("goal_streaks")
+        if self.migration_task:
+            self.migration_task.cancel()
 
     async def cog_load(self):
         """Register commands when the cog is loaded."""
-        guild = discord.Object(id=GUILD_ID)
-        print(f"Registering commands in GoalTracking for guild {GUILD_ID}...")
+        guild = self.aurabot.command_guild  # None registers the commands globally
+        print(f"Registering commands in GoalTracking for {guild.id if guild else 'all guilds'}...")
         self.aurabot.tree.add_command(self.create_goal, guild=guild)
         self.aurabot.tree.add_command(self.update_goal, guild=guild)
         self.aurabot.tree.add_command(self.view_goal, guild=guild)
@@ -46,48 +73,137 @@ class GoalTracking(commands.Cog):
         self.aurabot.tree.add_command(self.delete_goal, guild=guild)
         self.aurabot.tree.add_command(self.view_points, guild=guild)
 
+        # Convert legacy deadline strings and progress lists in the background
+        self.migration_task = asyncio.create_task(self.migrate_legacy_progress())
+
+        # One persistent handler for every /updategoal menu, old or new
+        self.aurabot.add_view(GoalSelectView(self))
+
+        # Deadline reminders: an hourly indexed sweep queues the goals due within the next
+        # window as exact-time scheduler entries
+        self.aurabot.scheduler.register("goal", self.send_goal_reminder)
+        self.aurabot.scheduler.register("goal_deadlines", self.schedule_due_goals)
+        self.aurabot.scheduler.schedule(("goal_deadlines",), utcnow())
 
-    async def send_goal_reminders(self):
-        """Background task to send reminders for goals with upcoming deadlines and manage points."""
-        await self.aurabot.wait_until_ready()
-        while not self.aurabot.is_closed():
-            now = datetime.utcnow()
-            users = self.collection.find()
+        # Nightly job that zeroes streaks broken by a missed day
+        self.aurabot.scheduler.register("goal_streaks", self.repair_streaks)
+        self.aurabot.scheduler.schedule(("goal_streaks",), next_daily_utc(STREAK_REPAIR_TIME))
 
-            for user in users:
-                updated = False  # Track if the user's data was updated
+    async def migrate_legacy_progress(self):
+        """Move every goal's `progress` string list into its `days` bitset, then seed missing streak counters."""
+        try:
+            await self.migrate_deadlines()
+            migrated = await migrate_string_logs(self.collection, "goals", "goal", "progress")
+            if migrated:
+                print(f"Migrated {migrated} goal progress logs to bitsets.")
+            seeded = await backfill_stats(self.collection, "goals", "goal")
+            if seeded:
+                print(f"Seeded streak counters for {seeded} goals.")
+        except Exception as e:
+            print(f"Error migrating goal progress: {e}")
+
+    async def repair_streaks(self, key):
+        """Scheduler job: reset current streaks of goals that missed a day."""
+        try:
+            await reset_broken_streaks(self.collection, "goals", utcnow().date(), self.aurabot.user_filter())
+        except Exception as e:
+            print(f"Error repairing goal streaks: {e}")
+        return next_daily_utc(STREAK_REPAIR_TIME)
+
+    @staticmethod
+    def deadline_at(deadline):
+        """Native UTC datetime stored next to the "YYYY-MM-DD" deadline string."""
+        return datetime.strptime(deadline, "%Y-%m-%d").replace(tzinfo=timezone.utc)
+
+    @staticmethod
+    def reminder_time(deadline_at):
+        """UTC time a deadline reminder is due: the start of the day before the deadline."""
+        return deadline_at.replace(tzinfo=timezone.utc) - timedelta(days=1)
+
+    async def migrate_deadlines(self):
+        """Add `deadline_at` to goals created before deadlines were stored as dates."""
+        missing = {"deadline": {"$exists": True}, "deadline_at": {"$exists": False}}
+        users = self.collection.find({"goals": {"$elemMatch": missing}}, {"goals.goal": 1, "goals.deadline": 1})
+        async for user in users:
+            for goal in user.get("goals", []):
+                if not goal.get("deadline"):
+                    continue
+                await self.collection.update_one(
+                    {"_id": user["_id"], "goals": {"$elemMatch": dict(missing, goal=goal["goal"])}},
+                    {"$set": {"goals.$.deadline_at": self.deadline_at(goal["deadline"])}}
+                )
+
+    async def schedule_due_goals(self, key, user_id=None):
+        """
+        Scheduler job: query only unreminded goals whose reminder falls before the end of
+        the next window and give each an exact-time scheduler entry. Only `user_id`'s goals if given.
+        """
+        now = utcnow()
+        horizon = now + DEADLINE_WINDOW + timedelta(days=1)  # Reminders go out a day before the deadline
+        due = {"$lte": ["$$goal.deadline_at", horizon]}
+        unreminded = {"$eq": ["$$goal.reminded", False]}
+        pipeline = [
+            {"$match": {
+                "goals": {"$elemMatch": {"reminded": False, "deadline_at": {"$lte": horizon}}},
+                **({"_id": user_id} if user_id is not None else self.aurabot.user_filter()),  # Only this process's users
+            }},
+            {"$project": {"goals": {"$filter": {
+                "input": "$goals", "as": "goal", "cond": {"$and": [unreminded, due]}
+            }}}},
+            {"$project": {"goals.goal": 1, "goals.deadline_at": 1}},
+        ]
+        try:
+            async for user in self.collection.aggregate(pipeline):
                 for goal in user["goals"]:
-                    deadline = goal.get("deadline")
-                    last_update = goal.get("last_update")
-
-                    # Check for upcoming deadlines
-                    if deadline:
-                        deadline_date = datetime.strptime(deadline, "%Y-%m-%d")
-                        if now.date() >= (deadline_date - timedelta(days=1)).date() and not goal.get("reminded", False):
-                            user_obj = await self.aurabot.fetch_user(user["_id"])
-                            try:
-                                await user_obj.send(
-                                    f"Reminder: Your goal `{goal['goal']}` has a deadline on {goal['deadline']}!"
-                                )
-                                goal["reminded"] = True
-                                updated = True
-                            except discord.Forbidden:
-                                print(f"Failed to send reminder to user {user['_id']} (DMs disabled).")
-
-                    # Handle point deduction for no progress
-                    if last_update:
-                        last_update_date = datetime.strptime(last_update, "%Y-%m-%d").date()
-                        if (now.date() - last_update_date).days >= 1:
-                            # Deduct points for inactivity
-                            user["points"] = user.get("points", 0) - 1
-                            if user["points"] < 0:
-                                user["points"] = 0  # Ensure points don't go negative
-                            updated = True
-
-                # Save changes to the database
-                if updated:
-                    self.collection.update_one({"_id": user["_id"]}, {"$set": user})
-            await asyncio.sleep(3600)  # Check every hour
+                    self.aurabot.scheduler.schedule(
+                        ("goal", user["_id"], goal["goal"]), max(self.reminder_time(goal["deadline_at"]), now)
+                    )
+        except Exception as e:
+            print(f"Error scheduling goal reminders: {e}")
+        return now + DEADLINE_WINDOW
+
+    @commands.Cog.listener()
+    async def on_data_imported(self, user_id):
+        """Schedule the deadline reminders of goals added by /importdata."""
+        if self.aurabot.owns_user(user_id):
+            await self.schedule_due_goals(None, user_id)
+
+    @commands.Cog.listener()
+    async def on_partitions_changed(self):
+        """Sweep for the deadline reminders of users this instance just took over."""
+        await self.schedule_due_goals(None)
+
+    async def send_goal_reminder(self, key):
+        """Scheduler handler: DM the deadline reminder once and flag the goal as reminded."""
+        _, user_id, goal_name = key
+        if not self.aurabot.owns_user(user_id):
+            return None  # Another process handles this user
+
+        # Claim the reminder atomically, so two instances overlapping during a rebalance
+        # can't both send it
+        user = await self.collection.find_one_and_update(
+            {"_id": user_id, "goals": {"$elemMatch": {"goal": goal_name, "reminded": False}}},
+            {"$set": {"goals.$.reminded": True}},
+            projection={"goals.$": 1}
+        )
+        if not user:
+            return None  # Goal was deleted or already reminded
+        goal = user["goals"][0]
+
+        # If the DM isn't sent, the claim is released and the hourly sweep tries again
+        queued = await self.aurabot.dm_delivery.enqueue(
+            user_id, f"Reminder: Your goal `{goal['goal']}` has a deadline on {goal['deadline']}!",
+            on_failed=lambda: self.release_reminder(user_id, goal_name)
+        )
+        if not queued:
+            await self.release_reminder(user_id, goal_name)  # DMs are closed
+        return None
+
+    async def release_reminder(self, user_id, goal_name):
+        """Release a deadline reminder's claim so the goal stays unreminded."""
+        await self.collection.update_one(
+            {"_id": user_id, "goals.goal": goal_name}, {"$set": {"goals.$.reminded": False}}
+        )
 
     @discord.app_commands.command(name="creategoal", description="Create a goal with an optional deadline.")
     async def create_goal(self, interaction: discord.Interaction, goal: str, deadline: str = None):
@@ -107,22 +223,37 @@ class GoalTracking(commands.Cog):
                 )
                 return
 
+        if len(goal) > MAX_NAME_LENGTH:
+            await interaction.response.send_message(
+                f"Goal names can be at most {MAX_NAME_LENGTH} characters.", ephemeral=True
+            )
+            return
+
         user_id = interaction.user.id
 
         # Create the goal data
         goal_data = {
             "goal": goal,
-            "progress": [],
+            "days": {},
+            "stats": dict(EMPTY_STATS),
             "completed": False
         }
         if deadline:
             goal_data["deadline"] = deadline
+            goal_data["deadline_at"] = self.deadline_at(deadline)
             goal_data["reminded"] = False  # Track if the reminder was sent
 
         try:
             # Add the goal to the database
-            self.collection.update_one({"_id": user_id}, {"$addToSet": {"goals": goal_data}}, upsert=True)
+            await self.collection.update_one({"_id": user_id}, {"$addToSet": {"goals": goal_data}}, upsert=True)
+            await self.aurabot.names.add(user_id, "goals", goal)
+            self.aurabot.charts.invalidate(user_id, "goals")
             if deadline:
+                # Goals due beyond the current window, or owned by another process,
+                # are picked up by the next sweep
+                reminder_at = self.reminder_time(goal_data["deadline_at"])
+                if reminder_at <= utcnow() + DEADLINE_WINDOW and self.aurabot.owns_user(user_id):
+                    self.aurabot.scheduler.schedule(("goal", user_id, goal), max(reminder_at, utcnow()))
                 await interaction.response.send_message(f"Goal `{goal}` added with a deadline on {deadline}.")
             else:
                 await interaction.response.send_message(f"Goal `{goal}` added without a deadline.")
@@ -130,82 +261,90 @@ class GoalTracking(commands.Cog):
             print(f"Database error: {e}")
             await interaction.response.send_message("An error occurred while saving your goal. Please try again.")
 
+    async def record_progress(self, interaction: discord.Interaction, user_id, goal):
+        """Log today's progress on `goal` and reply to `interaction`."""
+        today = datetime.utcnow().date()
+
+        # Set today's bit and stamp last_update in one atomic update that only matches
+        # if the goal exists and has no progress today (`progress` is the legacy string
+        # list, checked until the background migration removes it)
+        not_logged = {"goal": goal, "progress": {"$ne": today.strftime("%Y-%m-%d")}}
+        not_logged.update(not_logged_filter(today))
+        before = await self.collection.find_one_and_update(
+            {"_id": user_id, "goals": {"$elemMatch": not_logged}},
+            {
+                "$bit": log_day_update(today, "goals.$.days"),
+                "$set": {"goals.$.last_update": today.strftime("%Y-%m-%d")},
+            },
+            projection={"goals": {"$elemMatch": {"goal": goal}}}
+        )
+        if before:
+            # Only one update per goal per day gets here, so the counters can't race
+            goal_before = before["goals"][0]
+            stats = advance(item_stats(goal_before), today)
+            await self.collection.update_one(
+                {"_id": user_id, "goals.goal": goal},
+                {"$set": {"goals.$.stats": stats}}
+            )
+            self.aurabot.charts.invalidate(user_id, "goals")
+
+            # Settle the decay this goal accrued while idle, then award points for progress
+            points = await self.points.award_progress(user_id, goal_before)
+            await interaction.response.send_message(
+                f"Progress for goal `{goal}` logged for today. "
+                f"You earned {PROGRESS_AWARD} points! 🎉\n"
+                f"Your total points: {points} | "
+                f"Current streak: {stats['current']} day(s)", ephemeral=True
+            )
+            return
+
+        goal_exists = await self.collection.count_documents(
+            {"_id": user_id, "goals.goal": goal}, limit=1
+        )
+        if goal_exists:
+            await interaction.response.send_message(
+                f"Progress for goal `{goal}` already logged today.", ephemeral=True
+            )
+            return
+
+        # The goal was deleted after the menu was sent
+        await interaction.response.send_message(f"Goal `{goal}` not found.", ephemeral=True)
+
     @discord.app_commands.command(name="updategoal", description="Update progress for a goal.")
     async def update_goal(self, interaction: discord.Interaction):
         """Update progress for a goal using a dropdown menu."""
         print("update_goal triggered")
 
         user_id = interaction.user.id
-        user_data = self.collection.find_one({"_id": user_id})
+        user_data = await self.collection.find_one({"_id": user_id}, {"goals.goal": 1, "goals.completed": 1})
 
         if not user_data or "goals" not in user_data or len(user_data["goals"]) == 0:
             await interaction.response.send_message("You don't have any tracked goals.", ephemeral=True)
             return
 
-        # Extract goals for dropdown
+        # Extract goals for dropdown; the option value is all a selection carries back
         goal_options = [
-            discord.SelectOption(label=goal["goal"], description="Click to log progress for this goal")
-            for goal in user_data["goals"] if not goal.get("completed", False)
-        ]
-
-        # Define the dropdown menu
-        class GoalSelectView(View):
-            def __init__(self, collection, user_data, user_id):
-                super().__init__()
-                self.collection = collection
-                self.user_data = user_data
-                self.user_id = user_id
-                self.select = Select(
-                    placeholder="Select a goal to log progress...",
-                    options=goal_options,
-                    custom_id="goal_select"
-                )
-                self.select.callback = self.select_callback  # Set callback for the select
-                self.add_item(self.select)
-
-            async def select_callback(self, select_interaction: discord.Interaction):
-                selected_goal = self.select.values[0]  # Get the selected goal
-
-                # Update the database
-                for goal in self.user_data["goals"]:
-                    if goal["goal"] == selected_goal:
-                        today = datetime.utcnow().strftime("%Y-%m-%d")
-                        if today in goal.get("progress", []):
-                            await select_interaction.response.send_message(
-                                f"Progress for goal `{selected_goal}` already logged today.", ephemeral=True
-                            )
-                            return
-                        goal.setdefault("progress", []).append(today)
-                        goal["last_update"] = today
-
-                        # Award points for progress
-                        self.user_data["points"] = self.user_data.get("points", 0) + 5
-
-                        self.collection.update_one(
-                            {"_id": self.user_id}, {"$set": {"goals": self.user_data["goals"], "points": self.user_data["points"]}}
-                        )
-                        await select_interaction.response.send_message(
-                            f"Progress for goal `{selected_goal}` logged for today. You earned 5 points! 🎉\n"
-                            f"Your total points: {self.user_data['points']}", ephemeral=True
-                        )
-                        return
-
-                # If the goal isn't found (shouldn't happen)
-                await select_interaction.response.send_message(
-                    f"An error occurred while logging progress for the goal `{selected_goal}`.", ephemeral=True
-                )
+            discord.SelectOption(label=goal["goal"], value=goal["goal"],
+                                 description="Click to log progress for this goal")
+            for goal in user_data["goals"]
+            if not goal.get("completed", False) and len(goal["goal"]) <= MAX_NAME_LENGTH
+        ][:MAX_SELECT_OPTIONS]
+        if not goal_options:
+            await interaction.response.send_message("You don't have any goals in progress.", ephemeral=True)
+            return
 
-        # Show the dropdown menu to the user
-        view = GoalSelectView(self.collection, user_data, user_id)
+        # Per-message copy only renders the options; it is stopped so it isn't kept in memory,
+        # and the selection is handled by the persistent view registered in cog_load
+        view = GoalSelectView(self, goal_options)
+        view.stop()
         await interaction.response.send_message("Select a goal to log progress:", view=view, ephemeral=True)
 
     @discord.app_commands.command(name="viewpoints", description="View your current points.")
     async def view_points(self, interaction: discord.Interaction):
         """Display the user's current points."""
         user_id = interaction.user.id
-        user_data = self.collection.find_one({"_id": user_id})
-
-        points = user_data.get("points", 0) if user_data else 0
+        # Inactivity decay is applied lazily from each goal's last_update
+        points = await self.points.current_balance(user_id)
         await interaction.response.send_message(f"You currently have {points} points. Keep up the great work! 🌟")
 
     @discord.app_commands.command(name="viewgoal", description="View your tracked goals.")
@@ -214,62 +353,75 @@ class GoalTracking(commands.Cog):
         print("view_goal triggered")
 
         user_id = interaction.user.id
-        user_data = self.collection.find_one({"_id": user_id})
+        user_data = await item_summaries(
+            self.collection, user_id, "goals", ("goal", "deadline", "completed", "last_update"), "progress",
+            extra=("points",)
+        )
 
-        if not user_data or "goals" not in user_data:
+        if not user_data or not user_data["goals"]:
             await interaction.response.send_message("You don't have any tracked goals.")
             return
 
+        today = datetime.utcnow().date()
         embed = discord.Embed(title="Your Goals", color=discord.Color.blue())
         for goal in user_data["goals"]:
-            progress = len(goal["progress"])
+            stats = item_stats(goal)
             deadline = goal.get("deadline", "No deadline")
             completed = "✅" if goal.get("completed", False) else "❌"
             embed.add_field(
                 name=goal["goal"],
-                value=f"Deadline: {deadline} | Progress Days: {progress} | Completed: {completed}",
+                value=(
+                    f"Deadline: {deadline} | Progress Days: {stats['total']} | Completed: {completed}\n"
+                    f"{format_stats(stats, today)}"
+                ),
                 inline=False
             )
 
-        points = user_data.get("points", 0)
+        points = PointsLedger.balance(user_data)
         embed.add_field(name="Your Points", value=f"{points} points", inline=False)
 
         await interaction.response.send_message(embed=embed)
 
     @discord.app_commands.command(name="deletegoal", description="Delete a specific goal.")
+    @discord.app_commands.describe(goal="Goal to delete (start typing to search your goals)")
     async def delete_goal(self, interaction: discord.Interaction, goal: str):
         """Delete a specific goal for the user."""
         user_id = interaction.user.id
 
-        # Try to find the user's data
-        user_data = self.collection.find_one({"_id": user_id})
-
-        if not user_data or "goals" not in user_data or len(user_data["goals"]) == 0:
-            await interaction.response.send_message("You don't have any tracked goals.", ephemeral=True)
-            return
-
-        # Find the goal to delete
-        goal_to_delete = None
-        for g in user_data["goals"]:
-            if g["goal"] == goal:
-                goal_to_delete = g
-                break
-
-        if not goal_to_delete:
-            await interaction.response.send_message(f"Goal `{goal}` not found.", ephemeral=True)
-            return
-
-        # Remove the goal from the database
+        # Remove the goal and get back only its name and last_update, for settling its decay
         try:
-            self.collection.update_one(
-                {"_id": user_id},
-                {"$pull": {"goals": {"goal": goal}}}
+            before = await self.collection.find_one_and_update(
+                {"_id": user_id, "goals.goal": goal},
+                {"$pull": {"goals": {"goal": goal}}},
+                projection={"_id": 0, "goals": {"$map": {
+                    "input": {"$filter": {"input": "$goals", "as": "g", "cond": {"$eq": ["$$g.goal", goal]}}},
+                    "as": "g",
+                    "in": {"goal": "$$g.goal", "last_update": "$$g.last_update"},
+                }}}
             )
+            if not before:
+                has_goals = await self.collection.count_documents({"_id": user_id, "goals.0": {"$exists": True}}, limit=1)
+                if has_goals:
+                    await interaction.response.send_message(f"Goal `{goal}` not found.", ephemeral=True)
+                else:
+                    await interaction.response.send_message("You don't have any tracked goals.", ephemeral=True)
+                return
+
+            await self.points.settle_removed(user_id, before["goals"])
+            await self.aurabot.names.remove(user_id, "goals", [goal])
+            self.aurabot.charts.invalidate(user_id, "goals")
+            self.aurabot.scheduler.cancel(("goal", user_id, goal))
             await interaction.response.send_message(f"Goal `{goal}` has been deleted.", ephemeral=True)
         except Exception as e:
             print(f"Error deleting goal for user {user_id}: {e}")
             await interaction.response.send_message("An error occurred while deleting your goal.")
 
+    @delete_goal.autocomplete("goal")
+    async def goal_autocomplete(self, interaction: discord.Interaction, current: str):
+        """Suggest the user's goal names from the name index."""
+        names = await self.aurabot.names.search(interaction.user.id, "goals", current)
+        choices = [discord.app_commands.Choice(name=name[:100], value=name) for name in names]
+        return choices[:MAX_CHOICES]
 
     @discord.app_commands.command(name="cleargoal", description="Clear completed goals.")
     async def clear_goal(self, interaction: discord.Interaction):
@@ -277,11 +429,16 @@ class GoalTracking(commands.Cog):
         user_id = interaction.user.id
 
         try:
-            result = self.collection.update_one(
+            before = await self.collection.find_one_and_update(
                 {"_id": user_id},
-                {"$pull": {"goals": {"completed": True}}}
+                {"$pull": {"goals": {"completed": True}}},
+                projection={"goals.goal": 1, "goals.completed": 1, "goals.last_update": 1}
             )
-            if result.modified_count > 0:
+            cleared = [g for g in (before or {}).get("goals", []) if g.get("completed", False)]
+            if cleared:
+                await self.points.settle_removed(user_id, cleared)
+                await self.aurabot.names.remove(user_id, "goals", [g["goal"] for g in cleared])
+                self.aurabot.charts.invalidate(user_id, "goals")
                 await interaction.response.send_message("All completed goals have been cleared.")
             else:
                 await interaction.response.send_message("You don't have any completed goals to clear.")
@@ -1,6 +1,5 @@
 import discord
 from discord.ext import commands
-from config import GUILD_ID  # Import your guild ID
 
 class GoalTrackingMenu(commands.Cog):
     """Cog for displaying the goal tracking menu."""
@@ -19,7 +18,7 @@ class GoalTrackingMenu(commands.Cog):
         embed.add_field(name="/creategoal", value="Create a new goal. Input format: goal: 'Your Goal', deadline: 'YYYY-MM-DD'.", inline=False)
         embed.add_field(name="/updategoal", value="Update progress on your goal. Input format: goal: 'Your Goal', progress: percentage.", inline=False)
         embed.add_field(name="/viewgoal", value="View your current goals and progress. No input required.", inline=False)
-        embed.add_field(name="/deletegoal", value="Delete a specific goal. Input format: goal: 'Your Goal'.", inline=False)
+        embed.add_field(name="/deletegoal", value="Delete a specific goal. Input format: goal: 'Your Goal' (suggested as you type).", inline=False)
         embed.add_field(name="/cleargoal", value="Clear all completed goals for the user.", inline=False)
         embed.add_field(name="/viewPoints", value="Check current points.", inline=False)
 
@@ -28,7 +27,7 @@ class GoalTrackingMenu(commands.Cog):
 
     async def cog_load(self):
         """Register commands when the cog is loaded."""
-        guild = discord.Object(id=GUILD_ID)  # Ensure the guild ID is correct
+        guild = self.aurabot.command_guild  # None registers the commands globally
         self.aurabot.tree.add_command(self.goaltracking_menu, guild=guild)
 
 # Required setup function
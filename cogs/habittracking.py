@@ -1,15 +1,47 @@
 import asyncio
-from datetime import datetime
+from datetime import datetime, timedelta
 import discord
 from discord.ui import View, Select
 from discord.ext import commands
-from pymongo import MongoClient
-from dotenv import load_dotenv
-import os
-from config import GUILD_ID
-
-# Load environment variables
-load_dotenv()
+from autocomplete import MAX_CHOICES
+from config import SHARD_IDS, REMINDER_RESYNC_MINUTES
+from scheduler import next_daily_utc, utcnow
+from daylog import DayLog, log_day_update, migrate_string_logs, not_logged_filter
+from streaks import EMPTY_STATS, advance, backfill_stats, format_stats, item_stats, item_summaries, reset_broken_streaks
+
+# UTC time of the nightly streak repair job
+STREAK_REPAIR_TIME = "00:05"
+
+# Overlap between reminder reloads, so habits added on a host with a slightly different clock aren't missed
+RELOAD_MARGIN = timedelta(minutes=1)
+
+# Discord limits: select option values / labels and options per select
+MAX_NAME_LENGTH = 100
+MAX_SELECT_OPTIONS = 25
+
+class HabitSelectView(View):
+    """Habit dropdown for /loghabit.
+
+    One persistent instance (no timeout, fixed custom_id) is registered at startup
+    and handles selections from every /loghabit message, including ones sent before
+    a restart. The selected option's value is the habit name, so the view holds no
+    user data.
+    """
+
+    def __init__(self, cog, options=()):
+        super().__init__(timeout=None)
+        self.cog = cog
+        self.select = Select(
+            placeholder="Select a habit to log...",
+            options=list(options),
+            custom_id="aurabot:habit_select"
+        )
+        self.select.callback = self.select_callback  # Set callback for the select
+        self.add_item(self.select)
+
+    async def select_callback(self, interaction: discord.Interaction):
+        # Menus are ephemeral, so whoever selects is the user the menu was sent to
+        await self.cog.record_log(interaction, interaction.user.id, self.select.values[0])
 
 class HabitTracking(commands.Cog):
     """Cog for tracking and logging user habits with optional reminders."""
@@ -17,50 +49,132 @@ class HabitTracking(commands.Cog):
     def __init__(self, aurabot):
         self.aurabot = aurabot
 
-        # MongoDB setup
-        mongo_url = os.getenv("MONGO_URL")
-        if not mongo_url:
-            raise ValueError("MongoDB connection string is not set in .env")
-
-        self.cluster = MongoClient(mongo_url)
-        self.db = self.cluster["AuraBotDB"]
-        self.collection = self.db["habit_tracking"]
-
-        print("Connected to MongoDB for habit tracking!")
-
-        # Start the reminder task
-        self.reminder_task = self.aurabot.loop.create_task(self.send_reminders())
+        # Shared MongoDB layer
+        self.collection = aurabot.db.habit_tracking
+        self.migration_task = None
+        self.synced_at = None  # When reminders were last loaded from the database
 
     async def cog_unload(self):
-        """Stop the reminder task when the cog is unloaded."""
-        self.reminder_task.cancel()
+        """Drop this cog's reminders from the shared scheduler."""
+        self.aurabot.scheduler.unregister("habit")
+        self.aurabot.scheduler.unregister("habit_streaks")
+        self.aurabot.scheduler.unregister("habit_reload")
+        if self.migration_task:
+            self.migration_task.cancel()
 
     async def cog_load(self):
         """Register commands when the cog is loaded."""
-        guild = discord.Object(id=GUILD_ID)
-        print(f"Registering commands in HabitTracking for guild {GUILD_ID}...")
+        guild = self.aurabot.command_guild  # None registers the commands globally
+        print(f"Registering commands in HabitTracking for {guild.id if guild else 'all guilds'}...")
         self.aurabot.tree.add_command(self.add_habit, guild=guild)
         self.aurabot.tree.add_command(self.log_habit, guild=guild)
         self.aurabot.tree.add_command(self.view_habits, guild=guild)
         self.aurabot.tree.add_command(self.clear_habit, guild=guild)
 
-    async def send_reminders(self):
-        """Background task to send reminders for unlogged habits with reminders."""
-        await self.aurabot.wait_until_ready()
-        while not self.aurabot.is_closed():
-            now = datetime.utcnow()
-            users = self.collection.find({"habits.reminder_time": {"$exists": True}})
-
-            for user in users:
-                for habit in user["habits"]:
-                    reminder_time = datetime.strptime(habit["reminder_time"], "%H:%M").time()
-                    if now.time() >= reminder_time and now.strftime("%Y-%m-%d") not in habit["logs"]:
-                        user_obj = await self.aurabot.fetch_user(user["_id"])
-                        try:
-                            await user_obj.send(f"Reminder: Log your habit `{habit['habit']}` for today!")
-                        except discord.Forbidden:
-                            print(f"Failed to send reminder to user {user['_id']} (DMs disabled).")
-            await asyncio.sleep(60)  # Check every minute
+        # Convert legacy string-list logs to bitsets in the background
+        self.migration_task = asyncio.create_task(self.migrate_legacy_logs())
+
+        # One persistent handler for every /loghabit menu, old or new
+        self.aurabot.add_view(HabitSelectView(self))
+
+        # Hand existing habit reminders to the shared scheduler
+        self.aurabot.scheduler.register("habit", self.send_reminder)
+        self.synced_at = utcnow()
+        await self.load_reminders()
+
+        # Habits added through other bot processes only reach this one by reloading
+        self.aurabot.scheduler.register("habit_reload", self.reload_reminders)
+        self.aurabot.scheduler.schedule(("habit_reload",), utcnow() + timedelta(minutes=REMINDER_RESYNC_MINUTES))
+
+        # Nightly job that zeroes streaks broken by a missed day
+        self.aurabot.scheduler.register("habit_streaks", self.repair_streaks)
+        self.aurabot.scheduler.schedule(("habit_streaks",), next_daily_utc(STREAK_REPAIR_TIME))
+
+    async def migrate_legacy_logs(self):
+        """Move every habit's `logs` string list into its `days` bitset, then seed missing streak counters."""
+        try:
+            migrated = await migrate_string_logs(self.collection, "habits", "habit", "logs")
+            if migrated:
+                print(f"Migrated {migrated} habit logs to bitsets.")
+            seeded = await backfill_stats(self.collection, "habits", "habit")
+            if seeded:
+                print(f"Seeded streak counters for {seeded} habits.")
+        except Exception as e:
+            print(f"Error migrating habit logs: {e}")
+
+    async def repair_streaks(self, key):
+        """Scheduler job: reset current streaks of habits that missed a day."""
+        try:
+            await reset_broken_streaks(self.collection, "habits", utcnow().date(), self.aurabot.user_filter())
+        except Exception as e:
+            print(f"Error repairing habit streaks: {e}")
+        return next_daily_utc(STREAK_REPAIR_TIME)
+
+    async def load_reminders(self, since=None):
+        """
+        Schedule the next reminder for every habit of this process's users that has a
+        reminder time, or only of users whose habits were added to since `since`.
+        """
+        query = {"habits.reminder_time": {"$exists": True}, **self.aurabot.user_filter()}
+        if since is not None:
+            query["habits_updated_at"] = {"$gte": since}
+        users = self.collection.find(query, {"habits.habit": 1, "habits.reminder_time": 1})
+        async for user in users:
+            self.schedule_habits(user)
+
+    def schedule_habits(self, user):
+        for habit in user.get("habits", []):
+            if habit.get("reminder_time"):
+                self.aurabot.scheduler.schedule(
+                    ("habit", user["_id"], habit["habit"]), next_daily_utc(habit["reminder_time"])
+                )
+
+    @commands.Cog.listener()
+    async def on_data_imported(self, user_id):
+        """Schedule the reminders of habits added by /importdata."""
+        if not self.aurabot.owns_user(user_id):
+            return
+        user = await self.collection.find_one({"_id": user_id}, {"habits.habit": 1, "habits.reminder_time": 1})
+        if user:
+            self.schedule_habits(user)
+
+    @commands.Cog.listener()
+    async def on_partitions_changed(self):
+        """Load the reminders of users this instance just took over from another one."""
+        try:
+            await self.load_reminders()
+        except Exception as e:
+            print(f"Error loading habit reminders after a rebalance: {e}")
+
+    async def reload_reminders(self, key):
+        """Scheduler job: pick up habit reminders added through other bot processes since the last sync."""
+        try:
+            if SHARD_IDS is not None or len(self.aurabot.coordinator.members) > 1:
+                started = utcnow()
+                await self.load_reminders(since=self.synced_at - RELOAD_MARGIN)
+                self.synced_at = started
+        except Exception as e:
+            print(f"Error reloading habit reminders: {e}")
+        return utcnow() + timedelta(minutes=REMINDER_RESYNC_MINUTES)
+
+    async def send_reminder(self, key):
+        """Scheduler handler: remind the user if the habit isn't logged yet, then reschedule."""
+        _, user_id, habit_name = key
+        if not self.aurabot.owns_user(user_id):
+            return None  # Another process handles this user
+        user = await self.collection.find_one(
+            {"_id": user_id, "habits.habit": habit_name}, {"habits.$": 1}
+        )
+        if not user:
+            return None  # Habit was cleared since it was scheduled
+        habit = user["habits"][0]
+        if not habit.get("reminder_time"):
+            return None
+
+        today = datetime.utcnow().date()
+        if today not in DayLog.from_document(habit.get("days"), habit.get("logs")):
+            await self.aurabot.dm_delivery.enqueue(user_id, f"Reminder: Log your habit `{habit_name}` for today!")
+        return next_daily_utc(habit["reminder_time"])
 
     @discord.app_commands.command(name="addhabit", description="Add a habit to track.")
     async def add_habit(self, interaction: discord.Interaction, habit: str, reminder_time: str = None):
@@ -80,20 +194,36 @@ class HabitTracking(commands.Cog):
                 )
                 return
 
+        if len(habit) > MAX_NAME_LENGTH:
+            await interaction.response.send_message(
+                f"Habit names can be at most {MAX_NAME_LENGTH} characters.", ephemeral=True
+            )
+            return
+
         user_id = interaction.user.id
 
         # Create the habit data
         habit_data = {
             "habit": habit,
-            "logs": []
+            "days": {},
+            "stats": dict(EMPTY_STATS)
         }
         if reminder_time:
             habit_data["reminder_time"] = reminder_time
 
         try:
             # Add the habit to the database
-            self.collection.update_one({"_id": user_id}, {"$addToSet": {"habits": habit_data}}, upsert=True)
+            await self.collection.update_one(
+                {"_id": user_id},
+                {"$addToSet": {"habits": habit_data}, "$set": {"habits_updated_at": utcnow()}},
+                upsert=True
+            )
+            await self.aurabot.names.add(user_id, "habits", habit)
+            self.aurabot.charts.invalidate(user_id, "habits")
             if reminder_time:
+                # Another process schedules the reminder if it owns this user
+                if self.aurabot.owns_user(user_id):
+                    self.aurabot.scheduler.schedule(("habit", user_id, habit), next_daily_utc(reminder_time))
                 await interaction.response.send_message(f"Habit `{habit}` added with reminder at {reminder_time}.")
             else:
                 await interaction.response.send_message(f"Habit `{habit}` added without a reminder.")
@@ -101,88 +231,108 @@ class HabitTracking(commands.Cog):
             print(f"Database error: {e}")
             await interaction.response.send_message("An error occurred while saving your habit. Please try again.")
 
+    async def record_log(self, interaction: discord.Interaction, user_id, habit):
+        """Log `habit` for today and reply to `interaction`."""
+        today = datetime.utcnow().date()
+
+        # Set today's bit only if the habit exists and isn't logged today, in one atomic update
+        # (`logs` is the legacy string list, checked until the background migration removes it)
+        not_logged = {"habit": habit, "logs": {"$ne": today.strftime("%Y-%m-%d")}}
+        not_logged.update(not_logged_filter(today))
+        before = await self.collection.find_one_and_update(
+            {"_id": user_id, "habits": {"$elemMatch": not_logged}},
+            {"$bit": log_day_update(today, "habits.$.days")},
+            projection={"habits": {"$elemMatch": {"habit": habit}}}
+        )
+        if before:
+            # Only one log per habit per day gets here, so the counters can't race
+            stats = advance(item_stats(before["habits"][0]), today)
+            await self.collection.update_one(
+                {"_id": user_id, "habits.habit": habit},
+                {"$set": {"habits.$.stats": stats}}
+            )
+            self.aurabot.charts.invalidate(user_id, "habits")
+            await interaction.response.send_message(
+                f"Habit `{habit}` logged for today. "
+                f"Current streak: {stats['current']} day(s).", ephemeral=True
+            )
+            return
+
+        # Nothing matched: either already logged today or the habit is gone
+        habit_exists = await self.collection.count_documents(
+            {"_id": user_id, "habits.habit": habit}, limit=1
+        )
+        if habit_exists:
+            await interaction.response.send_message(
+                f"Habit `{habit}` already logged today.", ephemeral=True
+            )
+            return
+
+        await interaction.response.send_message(f"Habit `{habit}` not found.", ephemeral=True)
+
     @discord.app_commands.command(name="loghabit", description="Log your habit for today.")
-    async def log_habit(self, interaction: discord.Interaction):
-        """Log a habit for the current day using a dropdown menu."""
+    @discord.app_commands.describe(habit="Habit to log (leave empty to pick from a list)")
+    async def log_habit(self, interaction: discord.Interaction, habit: str = None):
+        """Log a habit for the current day, by name or using a dropdown menu."""
         print("log_habit triggered")
 
         user_id = interaction.user.id
-        user_data = self.collection.find_one({"_id": user_id})
+        if habit:
+            await self.record_log(interaction, user_id, habit)
+            return
+
+        # The name index has every habit name without loading the habit documents
+        habits = await self.aurabot.names.names(user_id, "habits")
 
-        if not user_data or "habits" not in user_data or len(user_data["habits"]) == 0:
+        if not habits:
             await interaction.response.send_message("You don't have any tracked habits.", ephemeral=True)
             return
 
-        # Extract habits for dropdown
+        # Extract habits for dropdown; the option value is all a selection carries back
         habit_options = [
-            discord.SelectOption(label=habit["habit"], description="Click to log this habit")
-            for habit in user_data["habits"]
-        ]
-
-        # Define the dropdown menu
-        class HabitSelectView(View):
-            def __init__(self, collection, user_data, user_id):
-                super().__init__()
-                self.collection = collection
-                self.user_data = user_data
-                self.user_id = user_id
-                self.select = Select(
-                    placeholder="Select a habit to log...",
-                    options=habit_options,
-                    custom_id="habit_select"
-                )
-                self.select.callback = self.select_callback  # Set callback for the select
-                self.add_item(self.select)
-
-            async def select_callback(self, select_interaction: discord.Interaction):
-                selected_habit = self.select.values[0]  # Get the selected habit
-                today = datetime.utcnow().strftime("%Y-%m-%d")
-
-                # Update the database
-                for habit in self.user_data["habits"]:
-                    if habit["habit"] == selected_habit:
-                        if today in habit.get("logs", []):
-                            await select_interaction.response.send_message(
-                                f"Habit `{selected_habit}` already logged today.", ephemeral=True
-                            )
-                            return
-                        habit.setdefault("logs", []).append(today)
-                        self.collection.update_one(
-                            {"_id": self.user_id}, {"$set": {"habits": self.user_data["habits"]}}
-                        )
-                        await select_interaction.response.send_message(
-                            f"Habit `{selected_habit}` logged for today.", ephemeral=True
-                        )
-                        return
-
-                # If the habit isn't found (shouldn't happen)
-                await select_interaction.response.send_message(
-                    f"An error occurred while logging the habit `{selected_habit}`.", ephemeral=True
-                )
+            discord.SelectOption(label=habit, value=habit, description="Click to log this habit")
+            for habit in habits if len(habit) <= MAX_NAME_LENGTH
+        ][:MAX_SELECT_OPTIONS]
+        if not habit_options:
+            # Only names too long for a select option are left; they can still be logged by name
+            await interaction.response.send_message(
+                "None of your habits fit in the menu. Use `/loghabit habit:<name>` instead.", ephemeral=True
+            )
+            return
 
-        # Show the dropdown menu to the user
-        view = HabitSelectView(self.collection, user_data, user_id)
+        # Per-message copy only renders the options; it is stopped so it isn't kept in memory,
+        # and the selection is handled by the persistent view registered in cog_load
+        view = HabitSelectView(self, habit_options)
+        view.stop()
         await interaction.response.send_message("Select a habit to log:", view=view, ephemeral=True)
 
+    @log_habit.autocomplete("habit")
+    async def habit_autocomplete(self, interaction: discord.Interaction, current: str):
+        """Suggest the user's habit names from the name index."""
+        names = await self.aurabot.names.search(interaction.user.id, "habits", current)
+        choices = [discord.app_commands.Choice(name=name[:100], value=name) for name in names]
+        return choices[:MAX_CHOICES]
+
     @discord.app_commands.command(name="viewhabits", description="View your tracked habits.")
     async def view_habits(self, interaction: discord.Interaction):
         """View the list of habits and their log status."""
         print("view_habits triggered")
 
         user_id = interaction.user.id
-        user_data = self.collection.find_one({"_id": user_id})
+        user_data = await item_summaries(self.collection, user_id, "habits", ("habit", "reminder_time"), "logs")
 
-        if not user_data or "habits" not in user_data:
+        if not user_data or not user_data["habits"]:
             await interaction.response.send_message("You don't have any tracked habits.")
             return
 
+        today = datetime.utcnow().date()
         embed = discord.Embed(title="Your Habits", color=discord.Color.green())
         for habit in user_data["habits"]:
-            logs = len(habit["logs"])
+            stats = item_stats(habit)
             reminder_time = habit.get("reminder_time", "No reminder")  # Use .get() to avoid KeyError
             embed.add_field(
                 name=habit["habit"],
-                value=f"Reminder: {reminder_time} | Days Logged: {logs}",
+                value=f"Reminder: {reminder_time} | Days Logged: {stats['total']} | {format_stats(stats, today)}",
                 inline=False
             )
         await interaction.response.send_message(embed=embed)
@@ -193,7 +343,10 @@ class HabitTracking(commands.Cog):
         user_id = interaction.user.id
 
         try:
-            result = self.collection.update_one({"_id": user_id}, {"$set": {"habits": []}})
+            result = await self.collection.update_one({"_id": user_id}, {"$set": {"habits": []}})
+            self.aurabot.scheduler.cancel_user("habit", user_id)
+            await self.aurabot.names.clear(user_id, "habits")
+            self.aurabot.charts.invalidate(user_id, "habits")
             if result.matched_count > 0:
                 await interaction.response.send_message("All your tracked habits have been cleared.")
             else:
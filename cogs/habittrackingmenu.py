@@ -1,6 +1,5 @@
 import discord
 from discord.ext import commands
-from config import GUILD_ID  # Import your guild ID
 
 class HabitTrackingMenu(commands.Cog):
     """Cog for displaying the habit tracking menu."""
@@ -17,14 +16,14 @@ class HabitTrackingMenu(commands.Cog):
             color=discord.Color.green()
         )
         embed.add_field(name="/addhabit", value="Add a habit to track. The input format is habit: text, reminder_time: HH:MM (24-hour clock).", inline=False)
-        embed.add_field(name="/loghabit", value="Log your habit for the day. The input format is a drop down menu.", inline=False)
+        embed.add_field(name="/loghabit", value="Log your habit for the day. Type the habit name (with suggestions) or leave it empty for a drop down menu.", inline=False)
         embed.add_field(name="/viewhabits", value="View your tracked habits. No input required.", inline=False)
         embed.add_field(name="/clearhabits", value="Clear all your tracked habits. No input required.", inline=False)
         await interaction.response.send_message(embed=embed)
 
     async def cog_load(self):
         """Register commands when the cog is loaded."""
-        guild = discord.Object(id=GUILD_ID)  # Ensure the guild ID is correct
+        guild = self.aurabot.command_guild  # None registers the commands globally
         self.aurabot.tree.add_command(self.habittracking_menu, guild=guild)
 
 # Required setup function
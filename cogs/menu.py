@@ -1,6 +1,5 @@
 import discord
 from discord.ext import commands
-from config import GUILD_ID  # Import GUILD_ID
 
 class Menu(commands.Cog):
     def __init__(self, aurabot):
@@ -16,15 +15,19 @@ class Menu(commands.Cog):
         )
         embed.add_field(name="/menu", value="Displays this menu of commands.", inline=False)
         embed.add_field(name="/createprofile", value="Creates a user profile.", inline=False)
+        embed.add_field(name="/settimezone", value="Sets your timezone.", inline=False)
         embed.add_field(name="/viewprofile", value="Displays a user's profile.", inline=False)
         embed.add_field(name="/habittracking", value="Displays list of habit tracking commands", inline=False)
         embed.add_field(name="/moodlogging", value="Displays list of mood logging commands", inline=False)
         embed.add_field(name="/goaltracking", value="Displays list of goal tracking commands.", inline=False)
+        embed.add_field(name="/charts", value="Shows a chart of your moods, habits or goals.", inline=False)
+        embed.add_field(name="/exportdata", value="Sends you a download of all your stored data.", inline=False)
+        embed.add_field(name="/importdata", value="Imports habits, goals and moods from a CSV or NDJSON file.", inline=False)
         await interaction.response.send_message(embed=embed)
 
     async def cog_load(self):
         """Register the menu command when the cog is loaded."""
-        guild = discord.Object(id=GUILD_ID)
+        guild = self.aurabot.command_guild  # None registers the commands globally
         self.aurabot.tree.add_command(self.menu, guild=guild)
 
 # Required setup function to add the cog
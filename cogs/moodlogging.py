@@ -1,18 +1,78 @@
 import asyncio
 import discord
-from discord.ext import tasks
 from discord import Interaction
 import logging
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 from discord.ext import commands
-from pymongo import MongoClient
-from dotenv import load_dotenv
-import os
-import pytz
-from config import GUILD_ID
+from scheduler import utcnow
+from timeslots import slot_fields
+from moodstore import MoodStore
+from moodtrends import MoodRollups, compute_trends, mood_score
+from daylog import DayLog
+
+# Longest gap of missed minutes a late scheduler wake-up will replay
+MAX_CATCH_UP_MINUTES = 5
+
+# /viewmoods paging; keeps every page well under Discord's 2000-character limit
+MOODS_PER_PAGE = 10
+MAX_MOOD_LENGTH = 150
+
+def local_day_start(date_text, tz, days_after=0):
+    """UTC instant at which a "YYYY-MM-DD" local day (plus `days_after` days) begins in `tz`."""
+    day = datetime.strptime(date_text, "%Y-%m-%d") + timedelta(days=days_after)
+    return tz.localize(day).astimezone(timezone.utc)
+
+class MoodPageView(discord.ui.View):
+    """Previous/next buttons for /viewmoods. Each page is fetched from the server when requested."""
+
+    def __init__(self, moods, user_id, start, end, page):
+        super().__init__(timeout=300)
+        self.moods = moods
+        self.user_id = user_id
+        self.start = start
+        self.end = end
+        self.page = page
+        self.total = 0
+
+    @property
+    def page_count(self):
+        return max((self.total + MOODS_PER_PAGE - 1) // MOODS_PER_PAGE, 1)
+
+    async def render(self):
+        """Fetch the current page and return the message text for it."""
+        entries, self.total = await self.moods.page(
+            self.user_id, self.start, self.end, self.page * MOODS_PER_PAGE, MOODS_PER_PAGE
+        )
+        if not entries and self.total:
+            # Asked for a page past the end; show the last one instead
+            self.page = self.page_count - 1
+            entries, self.total = await self.moods.page(
+                self.user_id, self.start, self.end, self.page * MOODS_PER_PAGE, MOODS_PER_PAGE
+            )
+
+        self.previous_page.disabled = self.page == 0
+        self.next_page.disabled = self.page >= self.page_count - 1
+
+        mood_list = "\n".join(
+            f"- {entry['mood'][:MAX_MOOD_LENGTH]} (logged at {entry['timestamp']})" for entry in entries
+        )
+        return f"Your logged moods (page {self.page + 1}/{self.page_count}):\n{mood_list}"
+
+    async def interaction_check(self, interaction: discord.Interaction):
+        return interaction.user.id == self.user_id
+
+    async def _turn(self, interaction, step):
+        self.page += step
+        content = await self.render()
+        await interaction.response.edit_message(content=content, view=self)
+
+    @discord.ui.button(label="Previous", style=discord.ButtonStyle.secondary)
+    async def previous_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self._turn(interaction, -1)
 
-# Load environment variables
-load_dotenv()
+    @discord.ui.button(label="Next", style=discord.ButtonStyle.secondary)
+    async def next_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self._turn(interaction, 1)
 
 class MoodLogging(commands.Cog):
     """Cog for logging user moods."""
@@ -20,102 +80,229 @@ class MoodLogging(commands.Cog):
     def __init__(self, aurabot):
         self.aurabot = aurabot
 
-        # MongoDB setup
-        mongo_url = os.getenv("MONGO_URL")
-        if not mongo_url:
-            raise ValueError("MongoDB connection string is not set in .env")
-        
-        try:
-            self.cluster = MongoClient(mongo_url, serverSelectionTimeOutMS=5000)
-            # Test connection
-            self.cluster.server_info()
-        except Exception as e:
-            raise ConnectionError(f"Failed to connect to MongoDB: {e}")
-        
-        # set up database and collections
-        self.cluster = MongoClient(mongo_url)
-        self.db = self.cluster["AuraBotDB"]
-        self.user_collection = self.db["user_profiles"]
-        self.mood_collection = self.db["mood_logging"]
-
-        #Start the reminder task loop
-        self.send_reminders.start()
+        # Shared MongoDB layer (connection health is checked once by AuraBot)
+        self.user_collection = aurabot.db.user_profiles
+        self.profiles = aurabot.profiles
+        self.mood_collection = aurabot.db.mood_logging
+        self.moods = MoodStore(aurabot.db)
+        self.rollups = MoodRollups(aurabot.db)
+        self.habit_collection = aurabot.db.habit_tracking
+        self.migration_task = None
+
+    async def cog_unload(self):
+        """Drop this cog's reminders from the shared scheduler."""
+        self.aurabot.scheduler.unregister("mood_slot")
+        if self.migration_task:
+            self.migration_task.cancel()
 
     async def cog_load(self):
         """Register commands when the cog is loaded."""
-        guild = discord.Object(id=GUILD_ID)  # Ensure GUILD_ID is correct
+        guild = self.aurabot.command_guild  # None registers the commands globally
         self.aurabot.tree.add_command(self.log_mood, guild=guild)
         self.aurabot.tree.add_command(self.view_moods, guild=guild)
         self.aurabot.tree.add_command(self.set_reminder, guild=guild)
         self.aurabot.tree.add_command(self.stop_reminder, guild=guild)
-        logging.info("Commands registered: logmood, viewmoods, setmoodreminder, stopmoodreminder")
+        self.aurabot.tree.add_command(self.mood_trends, guild=guild)
+        logging.info("Commands registered: logmood, viewmoods, setmoodreminder, stopmoodreminder, moodtrends")
+
+        # Move mood history out of the legacy single-document layout, then into the rollups,
+        # in the background
+        await self.rollups.start()
+        self.migration_task = asyncio.create_task(self.migrate_history())
+
+        # Mood reminders are served by one per-minute slot query on the shared scheduler
+        await self.backfill_reminder_slots()
+        self._last_slot_minute = utcnow().replace(second=0, microsecond=0)
+        self.aurabot.scheduler.register("mood_slot", self.send_slot_reminders)
+        self.aurabot.scheduler.schedule(("mood_slot",), self._last_slot_minute + timedelta(minutes=1))
+
+    async def migrate_history(self):
+        await self.moods.migrate_legacy()
+        await self.rollups.backfill()
+
+    async def backfill_reminder_slots(self):
+        """Store a UTC slot for reminders that were set before slots existed."""
+        reminders = {}
+        query = {"reminder_time": {"$ne": None}, "reminder_slot": {"$exists": False}}
+        async for user in self.mood_collection.find(query, {"reminder_time": 1}):
+            reminders[user["_id"]] = user["reminder_time"]
+        if not reminders:
+            return
+
+        # One batched profile lookup instead of one per user
+        timezones = {}
+        profiles = self.user_collection.find({"_id": {"$in": list(reminders)}}, {"timezone": 1})
+        async for profile in profiles:
+            timezones[profile["_id"]] = profile.get("timezone", "UTC")
+
+        for user_id, reminder_time in reminders.items():
+            await self.mood_collection.update_one(
+                {"_id": user_id},
+                {"$set": slot_fields(reminder_time, timezones.get(user_id, "UTC"))}
+            )
 
     @discord.app_commands.command(name="logmood", description="Log your mood for the day.")
-    async def log_mood(self, interaction: discord.Interaction, mood: str):
+    @discord.app_commands.describe(
+        mood="How you feel",
+        score="How good it is, from 1 (very low) to 5 (very good); used by /moodtrends"
+    )
+    async def log_mood(
+        self, interaction: discord.Interaction, mood: str, score: discord.app_commands.Range[int, 1, 5] = None
+    ):
         """Log a mood for the current day."""
 
         user_id = interaction.user.id
 
-        # Fetch the user's timezone from the profile collection
-        user_profile = self.user_collection.find_one({"_id": user_id})
+        # Fetch the user's profile and timezone (cached, defaulting to UTC if not set)
+        user_profile, tz = await self.profiles.get_with_timezone(user_id)
         if not user_profile:
             await interaction.response.send_message(
                 "You don't have a profile yet! Use `/createprofile` to set up your profile and timezone."
             )
             return
-
-        # Get the user's timezone, defaulting to UTC if not set
-        user_timezone = user_profile.get("timezone", "UTC")
-        tz = pytz.timezone(user_timezone)
+        user_timezone = tz.zone
 
         # Get the current time in the user's timezone
         now_local = datetime.now(tz)
 
-        # Log the mood with the local time
-        self.mood_collection.update_one(
-            {"_id": user_id},
-            {"$push": {"moods": {"mood": mood, "timestamp": now_local.strftime('%Y-%m-%d %H:%M:%S')}}},
-            upsert=True
-        )
+        # Log the mood with the local time into this month's bucket, and count it in the rollups
+        await self.moods.add(user_id, mood, now_local, score)
+        await self.rollups.add(user_id, now_local, score if score is not None else mood_score(mood))
+        self.aurabot.charts.invalidate(user_id, "moods")
         await interaction.response.send_message(
             f"Your mood `{mood}` has been logged at {now_local.strftime('%Y-%m-%d %H:%M:%S')} ({user_timezone})."
     )
 
 
     @discord.app_commands.command(name="viewmoods", description="View your logged moods.")
-    async def view_moods(self, interaction: discord.Interaction):
+    @discord.app_commands.describe(
+        start="Show moods from this date (YYYY-MM-DD)",
+        end="Show moods up to and including this date (YYYY-MM-DD)",
+        page="Page to start on"
+    )
+    async def view_moods(
+        self, interaction: discord.Interaction, start: str = None, end: str = None, page: int = 1
+    ):
         """Handles /viewmoods command."""
         user_id = interaction.user.id
 
         # Check if the user has a profile
-        user_profile = self.user_collection.find_one({"_id": user_id})
+        user_profile, tz = await self.profiles.get_with_timezone(user_id)
         if not user_profile:
             await interaction.response.send_message(
                 "You don't have a profile yet! Use `/createprofile` to set up your profile and timezone."
             )
             return
 
+        # Dates are the user's local calendar days; convert them to UTC instants
         try:
-            # Retrieve mood data
-            user_data = self.mood_collection.find_one({"_id": user_id})
-            if not user_data or "moods" not in user_data or not user_data["moods"]:
-                await interaction.response.send_message("You haven't logged any moods yet.")
-                return
+            start_utc = local_day_start(start, tz) if start else None
+            end_utc = local_day_start(end, tz, days_after=1) if end else None
+        except ValueError:
+            await interaction.response.send_message("Invalid date format. Use YYYY-MM-DD.", ephemeral=True)
+            return
 
-            # Format and display logged moods
-            mood_list = "\n".join(
-                [
-                    f"- {entry['mood']} (logged at {entry['timestamp']})"
-                    for entry in user_data["moods"]
-                ]
-            )
-            await interaction.response.send_message(f"Your logged moods:\n{mood_list}")
+        try:
+            # Make sure moods from the legacy layout are in the buckets before reading
+            await self.moods.migrate_user(user_id)
+
+            view = MoodPageView(self.moods, user_id, start_utc, end_utc, max(page, 1) - 1)
+            content = await view.render()
+            if view.total == 0:
+                await interaction.response.send_message("You haven't logged any moods in that range yet.")
+                return
+            await interaction.response.send_message(content, view=view)
         except Exception as e:
             logging.error(f"Error retrieving moods: {e}")
             await interaction.response.send_message("Failed to retrieve your moods. Please try again later.")
 
+    @discord.app_commands.command(name="moodtrends", description="See your mood trends and patterns.")
+    async def mood_trends(self, interaction: discord.Interaction):
+        """Handles /moodtrends: averages, weekday/hour patterns and habit correlations."""
+        user_id = interaction.user.id
 
+        user_profile, tz = await self.profiles.get_with_timezone(user_id)
+        if not user_profile:
+            await interaction.response.send_message(
+                "You don't have a profile yet! Use `/createprofile` to set up your profile and timezone."
+            )
+            return
+
+        try:
+            today = datetime.now(tz).date()
+            docs = await self.rollups.load(user_id, today.year - 1, today.year)
+            habit_data = await self.habit_collection.find_one(
+                {"_id": user_id}, {"habits.habit": 1, "habits.days": 1}
+            )
+            habits = {
+                habit["habit"]: DayLog.from_document(habit.get("days"))
+                for habit in (habit_data or {}).get("habits", [])
+            }
+            trends = compute_trends(docs, habits, today)
+        except Exception as e:
+            logging.error(f"Error computing mood trends: {e}")
+            await interaction.response.send_message("Failed to compute your mood trends. Please try again later.")
+            return
+
+        if not trends["moods_logged"]:
+            await interaction.response.send_message("You haven't logged any moods in the last year yet.")
+            return
+
+        def score(value):
+            return f"{value:.2f}/5" if value is not None else "n/a"
+
+        embed = discord.Embed(title="Your Mood Trends (last 365 days)", color=discord.Color.purple())
+        embed.add_field(
+            name="Logging",
+            value=f"{trends['moods_logged']} moods on {trends['days_logged']} days "
+                  f"({trends['scored_days']} days with a score)",
+            inline=False
+        )
+        if trends["average"] is None:
+            embed.add_field(
+                name="Scores",
+                value="Add a score when you log (`/logmood mood:... score:1-5`) to see averages and patterns.",
+                inline=False
+            )
+            await interaction.response.send_message(embed=embed)
+            return
 
+        change = ""
+        if trends["last_7"] is not None and trends["previous_7"] is not None:
+            delta = trends["last_7"] - trends["previous_7"]
+            change = f" ({'▲' if delta >= 0 else '▼'} {abs(delta):.2f} vs. the week before)"
+        embed.add_field(
+            name="Averages",
+            value=f"Last 7 days: {score(trends['last_7'])}{change}\n"
+                  f"Last 30 days: {score(trends['last_30'])}\n"
+                  f"Last 365 days: {score(trends['average'])}",
+            inline=False
+        )
+        if trends["weekdays"]:
+            best = max(trends["weekdays"], key=trends["weekdays"].get)
+            worst = min(trends["weekdays"], key=trends["weekdays"].get)
+            embed.add_field(
+                name="Weekdays",
+                value=" | ".join(f"{day} {value:.1f}" for day, value in trends["weekdays"].items())
+                      + f"\nBest: {best} | Hardest: {worst}",
+                inline=False
+            )
+        if trends["hours"]:
+            best_hour = max(trends["hours"], key=trends["hours"].get)
+            worst_hour = min(trends["hours"], key=trends["hours"].get)
+            embed.add_field(
+                name="Time of day",
+                value=f"Best around {best_hour:02d}:00 ({trends['hours'][best_hour]:.1f}) | "
+                      f"Lowest around {worst_hour:02d}:00 ({trends['hours'][worst_hour]:.1f})",
+                inline=False
+            )
+        if trends["habits"]:
+            lines = [
+                f"`{name}`: {c['with']:.1f} on days you did it vs. {c['without']:.1f} without (r = {c['r']:+.2f})"
+                for name, c in sorted(trends["habits"].items(), key=lambda item: -abs(item[1]["r"]))[:5]
+            ]
+            embed.add_field(name="Habits and mood", value="\n".join(lines), inline=False)
+        await interaction.response.send_message(embed=embed)
 
     @discord.app_commands.command(name="setmoodreminder", description="Set a daily mood logging reminder (format: HH:MM in 24-hour).")
     async def set_reminder(self, interaction: discord.Interaction, time: str):
@@ -124,7 +311,7 @@ class MoodLogging(commands.Cog):
         user_id = interaction.user.id
 
         # Check if the user has a profile
-        user_profile = self.user_collection.find_one({"_id": user_id})
+        user_profile, tz = await self.profiles.get_with_timezone(user_id)
         if not user_profile:
             await interaction.response.send_message(
                 "You don't have a profile yet! Use `/createprofile` to set up your profile and timezone."
@@ -139,21 +326,18 @@ class MoodLogging(commands.Cog):
             user_id = interaction.user.id
 
             # Check if the user exists in the mood_logging database
-            user_data = self.mood_collection.find_one({"_id": user_id})
+            user_data = await self.mood_collection.find_one({"_id": user_id})
             if not user_data:
                 # Create an entry for the user if it doesn't exist
-                self.mood_collection.insert_one({"_id": user_id, "reminder_time": None, "moods": []})
+                await self.mood_collection.insert_one({"_id": user_id, "reminder_time": None})
 
-            # Get the user's timezone (default to UTC if not set)
-            user_profile = self.user_collection.find_one({"_id": user_id})
-            user_timezone = user_profile.get("timezone", "UTC") if user_profile else "UTC"
-            tz = pytz.timezone(user_timezone)
+            # The user's timezone came with the cached profile (UTC if not set)
+            user_timezone = tz.zone
 
-
-            # Update the reminder time in the mood_logging database
-            self.mood_collection.update_one(
+            # Store the local reminder time together with its precomputed UTC slot
+            await self.mood_collection.update_one(
                 {"_id": user_id},
-                {"$set": {"reminder_time": time}},
+                {"$set": slot_fields(f"{hour:02d}:{minute:02d}", user_timezone)},
                 upsert=True
             )
 
@@ -175,21 +359,24 @@ class MoodLogging(commands.Cog):
         user_id = interaction.user.id
 
         # Check if the user has a profile
-        user_profile = self.user_collection.find_one({"_id": user_id})
+        user_profile = await self.profiles.get(user_id)
         if not user_profile:
             await interaction.response.send_message(
                 "You don't have a profile yet! Use `/createprofile` to set up your profile and timezone."
             )
             return
         # Check if the user exists in the mood_logging database
-        user_data = self.mood_collection.find_one({"_id": user_id})
+        user_data = await self.mood_collection.find_one({"_id": user_id})
         if not user_data:
             # Create an entry for the user if it doesn't exist
-            self.mood_collection.insert_one({"_id": user_id, "reminder_time": None, "moods": []})
+            await self.mood_collection.insert_one({"_id": user_id, "reminder_time": None})
         try:
-            self.mood_collection.update_one(
+            await self.mood_collection.update_one(
                 {"_id": user_id},
-                {"$set": {"reminder_time": None}},
+                {
+                    "$set": {"reminder_time": None},
+                    "$unset": {"reminder_timezone": "", "reminder_slot": "", "reminder_slot_expires": ""}
+                },
                 upsert=True
             )
             # Inform the user
@@ -201,44 +388,44 @@ class MoodLogging(commands.Cog):
             logging.error(f"Error stopping reminder: {e}")
             await interaction.response.send_message("Failed to stop reminders. Please try again later.")
 
-    @tasks.loop(minutes=1)
-    async def send_reminders(self):
-        """Send reminders for mood logging at the specified times."""
-        await self.aurabot.wait_until_ready()  # Ensure the bot is ready
-        while not self.aurabot.is_closed():
-            try:
-                now_utc = datetime.now(pytz.utc)  # Current time in UTC
-
-                # Find all users with a mood reminder set
-                users_with_reminders = self.mood_collection.find({"reminder_time": {"$exists": True}})
-                for user in users_with_reminders:
-                    user_id = user["_id"]
-
-                    # Get the user's timezone from the profile
-                    user_profile = self.user_collection.find_one({"_id": user_id})
-                    user_timezone = user_profile.get("timezone")
-                    tz = pytz.timezone(user_timezone)
-
-                    # Convert the current time to the user's timezone
-                    now_local = now_utc.astimezone(tz).strftime("%H:%M")
-        
-                    # Compare the user's local time with their reminder time
-                    if user.get("reminder_time") == now_local:
-                        user_obj = await self.aurabot.fetch_user(user_id)
-                        try:
-                            # Send the DM
-                            await user_obj.send("⏰ Don't forget to log your mood for today!")
-                        except discord.Forbidden:
-                            logging.warning(f"Failed to send reminder to user {user_id} (DMs may be disabled).")
-
-                await asyncio.sleep(60)  # Wait before checking again
-            except Exception as e:
-                logging.error(f"Error in send_reminders task: {e}")
-
-    @send_reminders.before_loop
-    async def before_send_reminders(self):
-        """Wait until the bot is ready before starting reminders."""
-        await self.aurabot.wait_until_ready()
+    async def refresh_expired_slots(self, now):
+        """Recompute slots whose timezone just changed its UTC offset (DST transitions)."""
+        expired = self.mood_collection.find(
+            {"reminder_slot_expires": {"$lte": now}, **self.aurabot.user_filter()},
+            {"reminder_time": 1, "reminder_timezone": 1}
+        )
+        async for user in expired:
+            await self.mood_collection.update_one(
+                {"_id": user["_id"]},
+                {"$set": slot_fields(user["reminder_time"], user.get("reminder_timezone", "UTC"), now)}
+            )
+
+    async def send_slot_reminders(self, key):
+        """Scheduler job: DM every user whose reminder falls in the minutes since the last run."""
+        now = utcnow().replace(second=0, microsecond=0)
+
+        # Catch up on minutes skipped by a late wake-up, but never replay more than a few
+        minutes = int((now - self._last_slot_minute).total_seconds() // 60)
+        if minutes < 1:
+            return now + timedelta(minutes=1)  # This minute was already served
+        slots = [
+            (now - timedelta(minutes=m)).hour * 60 + (now - timedelta(minutes=m)).minute
+            for m in range(min(minutes, MAX_CATCH_UP_MINUTES))
+        ]
+        self._last_slot_minute = now
+
+        try:
+            await self.refresh_expired_slots(now)
+
+            # A single indexed query returns only the users due in these slots
+            due = self.mood_collection.find(
+                {"reminder_slot": {"$in": slots}, **self.aurabot.user_filter()}, {"_id": 1}
+            )
+            async for user in due:
+                await self.aurabot.dm_delivery.enqueue(user["_id"], "⏰ Don't forget to log your mood for today!")
+        except Exception as e:
+            logging.error(f"Error in send_slot_reminders job: {e}")
+        return now + timedelta(minutes=1)
 
 
 # Required setup function
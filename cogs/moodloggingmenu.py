@@ -1,6 +1,5 @@
 import discord
 from discord.ext import commands
-from config import GUILD_ID  # Import your guild ID
 
 class MoodLoggingMenu(commands.Cog):
     """Cog for displaying the mood logging menu."""
@@ -16,15 +15,16 @@ class MoodLoggingMenu(commands.Cog):
             description="Here are the commands you can use for mood logging:",
             color=discord.Color.yellow()
         )
-        embed.add_field(name="/logmood", value="Log your mood for the day.", inline=False)
-        embed.add_field(name="/viewmoods", value="View your logged moods.", inline=False)
+        embed.add_field(name="/logmood", value="Log your mood for the day. Optional input: score 1-5.", inline=False)
+        embed.add_field(name="/moodtrends", value="See your mood averages, weekday/time-of-day patterns and how your habits relate to your mood.", inline=False)
+        embed.add_field(name="/viewmoods", value="View your logged moods, newest first. Optional input: start/end 'YYYY-MM-DD', page.", inline=False)
         embed.add_field(name="/setmoodreminder", value="Set a daily mood logging reminder.", inline=False)
         embed.add_field(name="/stopmoodreminder", value="Stop receiving daily reminders.", inline=False)
         await interaction.response.send_message(embed=embed)
 
     async def cog_load(self):
         """Register commands when the cog is loaded."""
-        guild = discord.Object(id=GUILD_ID)  # Ensure the guild ID is correct
+        guild = self.aurabot.command_guild  # None registers the commands globally
         self.aurabot.tree.add_command(self.moodlogging_menu, guild=guild)
 
 # Required setup function
@@ -0,0 +1,119 @@
+import io
+import logging
+from datetime import datetime, timedelta
+import discord
+from discord.ext import commands
+import numpy as np
+from daylog import DayLog
+from moodtrends import MoodRollups, daily_series
+from streaks import item_stats
+
+# Days shown by the mood chart and the habit heatmap
+MOOD_CHART_DAYS = 90
+HABIT_CHART_DAYS = 84
+
+class ProgressCharts(commands.Cog):
+    """Cog for rendering mood, habit and goal progress charts."""
+
+    def __init__(self, aurabot):
+        self.aurabot = aurabot
+
+        # Shared MongoDB layer and chart renderer
+        self.profiles = aurabot.profiles
+        self.habit_collection = aurabot.db.habit_tracking
+        self.goal_collection = aurabot.db.goal_tracking
+        self.rollups = MoodRollups(aurabot.db)
+        self.charts = aurabot.charts
+
+    async def cog_load(self):
+        """Register commands when the cog is loaded."""
+        guild = self.aurabot.command_guild  # None registers the commands globally
+        self.aurabot.tree.add_command(self.show_chart, guild=guild)
+
+    async def mood_chart_data(self, user_id):
+        _, tz = await self.profiles.get_with_timezone(user_id)
+        today = datetime.now(tz).date()
+        docs = await self.rollups.load(user_id, today.year - 1, today.year)
+        start, sums, counts, _ = daily_series(docs, today, MOOD_CHART_DAYS)
+        if not counts.any():
+            return None
+
+        # 7-day rolling average over the days that have a score
+        kernel = np.ones(7)
+        rolling_sums = np.convolve(sums, kernel)[:MOOD_CHART_DAYS]
+        rolling_counts = np.convolve(counts, kernel)[:MOOD_CHART_DAYS]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            daily = np.where(counts > 0, sums / counts, np.nan)
+            rolling = np.where(rolling_counts > 0, rolling_sums / rolling_counts, np.nan)
+        return {
+            "days": [start + timedelta(days=i) for i in range(MOOD_CHART_DAYS)],
+            "daily": daily.tolist(),
+            "rolling": rolling.tolist(),
+        }
+
+    async def habit_chart_data(self, user_id):
+        user_data = await self.habit_collection.find_one(
+            {"_id": user_id}, {"habits.habit": 1, "habits.days": 1, "habits.logs": 1}
+        )
+        habits = (user_data or {}).get("habits", [])
+        if not habits:
+            return None
+        today = datetime.utcnow().date()
+        days = [today - timedelta(days=i) for i in range(HABIT_CHART_DAYS - 1, -1, -1)]
+        logs = [DayLog.from_document(habit.get("days"), habit.get("logs")) for habit in habits]
+        return {
+            "habits": [habit["habit"] for habit in habits],
+            "days": [day.strftime("%m-%d") for day in days],
+            "grid": [[1 if day in log else 0 for day in days] for log in logs],
+        }
+
+    async def goal_chart_data(self, user_id):
+        user_data = await self.goal_collection.find_one(
+            {"_id": user_id},
+            {"goals.goal": 1, "goals.completed": 1, "goals.deadline": 1, "goals.stats": 1,
+             "goals.days": 1, "goals.progress": 1}
+        )
+        goals = (user_data or {}).get("goals", [])
+        if not goals:
+            return None
+        charted = []
+        for goal in goals:
+            stats = item_stats(goal)
+            charted.append({
+                "name": goal["goal"], "completed": goal.get("completed", False),
+                "deadline": goal.get("deadline"), "total": stats["total"], "current": stats["current"],
+            })
+        return {"goals": charted}
+
+    @discord.app_commands.command(name="charts", description="See a chart of your moods, habits or goals.")
+    @discord.app_commands.describe(kind="What to chart")
+    @discord.app_commands.choices(kind=[
+        discord.app_commands.Choice(name="Moods over time", value="moods"),
+        discord.app_commands.Choice(name="Habit heatmap", value="habits"),
+        discord.app_commands.Choice(name="Goal progress", value="goals"),
+    ])
+    async def show_chart(self, interaction: discord.Interaction, kind: discord.app_commands.Choice[str]):
+        """Handles /charts: renders off the event loop and sends the PNG as a followup."""
+        user_id = interaction.user.id
+        chart = kind.value
+
+        # Rendering can take longer than the 3 second response window
+        await interaction.response.defer(thinking=True)
+        try:
+            image = self.charts.cached(user_id, chart)
+            if image is None:
+                # Read before loading, so data that changes meanwhile isn't cached as current
+                version = self.charts.version(user_id, chart)
+                data = await getattr(self, f"{chart}_chart_data")(user_id)
+                if data is None:
+                    await interaction.followup.send(f"There's nothing to chart yet. Start tracking your {chart} first!")
+                    return
+                image = await self.charts.render(user_id, chart, data, version)
+            await interaction.followup.send(file=discord.File(io.BytesIO(image), filename=f"{chart}.png"))
+        except Exception as e:
+            logging.error(f"Error rendering {chart} chart for user {user_id}: {e}")
+            await interaction.followup.send("Failed to render your chart. Please try again later.")
+
+# Required setup function
+async def setup(aurabot):
+    await aurabot.add_cog(ProgressCharts(aurabot))
@@ -0,0 +1,189 @@
+import asyncio
+import io
+import logging
+import time
+import discord
+from discord.ext import commands
+from charts import CHART_KINDS
+from config import EXPORT_PART_BYTES, IMPORT_MAX_BYTES, IMPORT_BATCH_SIZE, IMPORT_PROGRESS_SECONDS
+from export import EXPORT_FORMATS, export_parts
+from importer import KINDS, Importer, attachment_lines, import_format, parse_rows
+
+# Discord allows at most 10 attachments per message
+MAX_FILES_PER_MESSAGE = 10
+
+class UserData(commands.Cog):
+    """Cog for exporting and importing a user's stored data."""
+
+    def __init__(self, aurabot):
+        self.aurabot = aurabot
+        self.exports = {}  # user id -> running export task
+        self.imports = {}  # user id -> running import task
+
+    async def cog_load(self):
+        """Register commands when the cog is loaded."""
+        guild = self.aurabot.command_guild  # None registers the commands globally
+        self.aurabot.tree.add_command(self.export_data, guild=guild)
+        self.aurabot.tree.add_command(self.import_data, guild=guild)
+
+    async def cog_unload(self):
+        for task in [*self.exports.values(), *self.imports.values()]:
+            task.cancel()
+
+    @staticmethod
+    def start_job(jobs, user_id, coroutine):
+        """Run a user's export or import in the background, tracked in `jobs` until it finishes."""
+        task = asyncio.create_task(coroutine)
+        jobs[user_id] = task
+        task.add_done_callback(lambda done: jobs.pop(user_id) if jobs.get(user_id) is done else None)
+
+    async def send_files(self, interaction, content, files):
+        """Send files as an ephemeral followup, or by DM once the interaction has expired (15 minutes)."""
+        def attachments():
+            return [discord.File(io.BytesIO(data), filename=name) for name, data in files]
+        if not interaction.is_expired():
+            try:
+                await interaction.followup.send(content, files=attachments(), ephemeral=True)
+                return
+            except discord.HTTPException as e:
+                # An expired token is a 401 "Invalid Webhook Token", not a NotFound
+                if e.status not in (401, 404):
+                    raise
+        await interaction.user.send(content, files=attachments())
+
+    async def run_export(self, interaction, fmt, limit):
+        """Stream the export, sending parts as soon as a message's worth is ready."""
+        user_id = interaction.user.id
+        batch, batch_size, sent = [], 0, 0
+        try:
+            async for name, data in export_parts(self.aurabot.db, user_id, fmt, limit):
+                if batch and (len(batch) == MAX_FILES_PER_MESSAGE or batch_size + len(data) > limit):
+                    await self.send_files(interaction, "Your AuraBot data export (continued):", batch)
+                    sent += len(batch)
+                    batch, batch_size = [], 0
+                batch.append((name, data))
+                batch_size += len(data)
+
+            if batch:
+                sent += len(batch)
+                await self.send_files(interaction, f"Your AuraBot data export is complete ({sent} file(s), gzip).", batch)
+            else:
+                await interaction.followup.send("You don't have any stored data to export.", ephemeral=True)
+        except Exception as e:
+            logging.error(f"Error exporting data for user {user_id}: {e}")
+            try:
+                await interaction.followup.send("Your data export failed. Please try again later.", ephemeral=True)
+            except discord.HTTPException:
+                pass
+
+    @discord.app_commands.command(name="exportdata", description="Download everything AuraBot has stored about you.")
+    @discord.app_commands.describe(format="File format (default: NDJSON)")
+    @discord.app_commands.choices(format=[
+        discord.app_commands.Choice(name="NDJSON (one JSON record per line)", value="ndjson"),
+        discord.app_commands.Choice(name="CSV (one file per record type)", value="csv"),
+    ])
+    async def export_data(self, interaction: discord.Interaction, format: discord.app_commands.Choice[str] = None):
+        """Handles /exportdata: the export runs in the background and is sent as followups."""
+        user_id = interaction.user.id
+        fmt = format.value if format else EXPORT_FORMATS[0]
+
+        running = self.exports.get(user_id)
+        if running and not running.done():
+            await interaction.response.send_message("Your data export is already running.", ephemeral=True)
+            return
+
+        # Parts must also fit the upload limit of the server the command was used in
+        limit = EXPORT_PART_BYTES
+        if interaction.guild:
+            limit = min(limit, interaction.guild.filesize_limit)
+
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        self.start_job(self.exports, user_id, self.run_export(interaction, fmt, limit))
+
+    async def report(self, interaction, content, final=False):
+        """Show import progress in the deferred response; the final report falls back to a DM."""
+        try:
+            await interaction.edit_original_response(content=content)
+        except discord.HTTPException:
+            if final:
+                await interaction.user.send(content)
+
+    async def run_import(self, interaction, attachment, fmt):
+        """Stream, validate and write the attachment, reporting progress every IMPORT_PROGRESS_SECONDS."""
+        user_id = interaction.user.id
+        try:
+            _, tz = await self.aurabot.profiles.get_with_timezone(user_id)
+            names = {kind: await self.aurabot.names.names(user_id, kind) for kind in KINDS}
+        except Exception as e:
+            logging.error(f"Error starting data import for user {user_id}: {e}")
+            await self.report(interaction, "Your data import failed. Please try again later.", final=True)
+            return
+        importer = Importer(self.aurabot.db, user_id, tz, names, IMPORT_BATCH_SIZE)
+
+        failed = False
+        last_report = time.monotonic()
+        try:
+            lines = attachment_lines(attachment.url, attachment.filename.lower().endswith(".gz"))
+            async for line_number, record_type, record in parse_rows(lines, fmt):
+                wrote = await importer.add(line_number, record_type, record)
+                if wrote and time.monotonic() - last_report >= IMPORT_PROGRESS_SECONDS:
+                    last_report = time.monotonic()
+                    await self.report(
+                        interaction, f"Importing `{attachment.filename}`... {importer.rows} rows read, "
+                        f"{importer.written} written so far."
+                    )
+            await importer.finish()
+        except Exception as e:
+            logging.error(f"Error importing data for user {user_id}: {e}")
+            failed = True
+
+        # Whatever was written before a failure is kept; re-running the import skips it
+        try:
+            for kind, items in importer.new_items.items():
+                if items:
+                    await self.aurabot.names.add_all(user_id, kind, [item[KINDS[kind][1]] for item in items])
+            for kind in CHART_KINDS:
+                self.aurabot.charts.invalidate(user_id, kind)
+            self.aurabot.dispatch("data_imported", user_id)
+        except Exception as e:
+            logging.error(f"Error updating indexes after importing data for user {user_id}: {e}")
+
+        summary = [
+            "Your import stopped early because of an error. Run it again to finish; rows already imported are skipped."
+            if failed else f"Import of `{attachment.filename}` complete.",
+            f"Rows read: {importer.rows} | Written: {importer.written} | Already present: {importer.unchanged} | "
+            f"Skipped (not importable): {importer.skipped} | Errors: {importer.error_count}",
+        ]
+        summary += [f"- Line {line_number}: {message[:150]}" for line_number, message in importer.errors]
+        if importer.error_count > len(importer.errors):
+            summary.append(f"...and {importer.error_count - len(importer.errors)} more error(s).")
+        await self.report(interaction, "\n".join(summary), final=True)
+
+    @discord.app_commands.command(name="importdata", description="Import habits, goals and moods from a CSV or NDJSON file.")
+    @discord.app_commands.describe(file="An /exportdata file or your own (.csv, .ndjson or .json, optionally .gz)")
+    async def import_data(self, interaction: discord.Interaction, file: discord.Attachment):
+        """Handles /importdata: the import runs in the background and reports progress in the response."""
+        user_id = interaction.user.id
+        fmt = import_format(file.filename)
+        if fmt is None:
+            await interaction.response.send_message(
+                "Please attach a .csv, .ndjson or .json file (optionally gzipped).", ephemeral=True
+            )
+            return
+        if file.size > IMPORT_MAX_BYTES:
+            await interaction.response.send_message(
+                f"That file is too large; imports can be at most {IMPORT_MAX_BYTES // (1024 * 1024)} MiB.", ephemeral=True
+            )
+            return
+
+        running = self.imports.get(user_id)
+        if running and not running.done():
+            await interaction.response.send_message("Your data import is already running.", ephemeral=True)
+            return
+
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        self.start_job(self.imports, user_id, self.run_import(interaction, file, fmt))
+
+# Required setup function
+async def setup(aurabot):
+    await aurabot.add_cog(UserData(aurabot))
@@ -2,4 +2,79 @@ import os
 from dotenv import load_dotenv
 
 load_dotenv()
-GUILD_ID = int(os.getenv("GUILD_ID"))  
+# Register commands on this guild only (instant updates while developing); unset for global commands
+GUILD_ID = int(os.getenv("GUILD_ID")) if os.getenv("GUILD_ID") else None
+
+# Sharding: SHARD_COUNT unset lets Discord pick it. To split the bot across processes, give every
+# process the same SHARD_COUNT and its own SHARD_IDS (e.g. "0,1"); users are partitioned the same way.
+SHARD_COUNT = int(os.getenv("SHARD_COUNT")) if os.getenv("SHARD_COUNT") else None
+SHARD_IDS = [int(i) for i in os.getenv("SHARD_IDS").split(",")] if os.getenv("SHARD_IDS") else None
+# Coordination between redundant instances (see coordination.py): live instances renew a lease
+# every LEASE_RENEW_SECONDS and split LEASE_PARTITIONS user partitions; a dead one's users move
+# after LEASE_TTL_SECONDS
+COORDINATION_GROUP = os.getenv("COORDINATION_GROUP", "aurabot")
+LEASE_TTL_SECONDS = int(os.getenv("LEASE_TTL_SECONDS", "15"))
+LEASE_RENEW_SECONDS = int(os.getenv("LEASE_RENEW_SECONDS", "5"))
+LEASE_PARTITIONS = int(os.getenv("LEASE_PARTITIONS", "64"))
+
+# How often a partitioned process reloads habit reminders added through other processes
+REMINDER_RESYNC_MINUTES = int(os.getenv("REMINDER_RESYNC_MINUTES", "5"))
+
+# How many due reminders are sent at once
+REMINDER_CONCURRENCY = int(os.getenv("REMINDER_CONCURRENCY", "20"))
+
+# Hash of the last synced command tree; the startup sync is skipped while it matches
+COMMAND_HASH_FILE = os.getenv("COMMAND_HASH_FILE", ".command_tree_hash")
+
+# Cogs loaded in the background after startup (menu-only cogs with no setup I/O)
+LAZY_COGS = [name.strip() for name in os.getenv(
+    "LAZY_COGS", "menu,habittrackingmenu,moodloggingmenu,goaltrackingmenu"
+).split(",") if name.strip()]
+
+# Health / readiness endpoints for a supervisor; disabled when HEALTH_PORT is 0
+HEALTH_HOST = os.getenv("HEALTH_HOST", "0.0.0.0")
+HEALTH_PORT = int(os.getenv("HEALTH_PORT", "0"))
+
+# MongoDB settings shared by every cog through AuraBot.db
+MONGO_URL = os.getenv("MONGO_URL")
+MONGO_DB_NAME = os.getenv("MONGO_DB_NAME", "AuraBotDB")
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "50"))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+MONGO_CONNECT_TIMEOUT_MS = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "5000"))
+MONGO_SOCKET_TIMEOUT_MS = int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", "10000"))
+
+# Reminder DM delivery
+DM_WORKERS = int(os.getenv("DM_WORKERS", "8"))
+DM_QUEUE_SIZE = int(os.getenv("DM_QUEUE_SIZE", "10000"))
+DM_RATE_PER_SECOND = float(os.getenv("DM_RATE_PER_SECOND", "25"))  # Leaves room under Discord's global 50/s for commands
+DM_CHANNEL_INTERVAL_SECONDS = float(os.getenv("DM_CHANNEL_INTERVAL_SECONDS", "1"))  # Per-channel message bucket is 5 per 5s
+DM_MAX_ATTEMPTS = int(os.getenv("DM_MAX_ATTEMPTS", "3"))
+DM_CLOSED_COOLDOWN_HOURS = float(os.getenv("DM_CLOSED_COOLDOWN_HOURS", "24"))
+DM_STATS_INTERVAL_SECONDS = int(os.getenv("DM_STATS_INTERVAL_SECONDS", "300"))
+
+# Resolved user / DM channel cache used by reminder delivery
+DM_CHANNEL_CACHE_SIZE = int(os.getenv("DM_CHANNEL_CACHE_SIZE", "20000"))
+DM_CHANNEL_CACHE_TTL_SECONDS = int(os.getenv("DM_CHANNEL_CACHE_TTL_SECONDS", "21600"))
+
+# Read-through cache of user profiles (username / timezone)
+PROFILE_CACHE_SIZE = int(os.getenv("PROFILE_CACHE_SIZE", "10000"))
+PROFILE_CACHE_TTL_SECONDS = int(os.getenv("PROFILE_CACHE_TTL_SECONDS", "900"))
+
+# Per-user goal/habit name lists served to autocomplete
+NAME_INDEX_CACHE_SIZE = int(os.getenv("NAME_INDEX_CACHE_SIZE", "10000"))
+NAME_INDEX_CACHE_TTL_SECONDS = int(os.getenv("NAME_INDEX_CACHE_TTL_SECONDS", "900"))
+
+# Chart rendering (process pool) and per-user PNG cache
+CHART_WORKERS = int(os.getenv("CHART_WORKERS", "2"))
+CHART_CACHE_SIZE = int(os.getenv("CHART_CACHE_SIZE", "2000"))
+CHART_CACHE_TTL_SECONDS = int(os.getenv("CHART_CACHE_TTL_SECONDS", "3600"))
+
+# /exportdata: largest gzip attachment sent (Discord's default upload limit is 10 MiB)
+EXPORT_PART_BYTES = int(os.getenv("EXPORT_PART_BYTES", str(8 * 1024 * 1024)))
+
+# /importdata: largest attachment accepted, rows per bulk write, seconds between progress updates
+IMPORT_MAX_BYTES = int(os.getenv("IMPORT_MAX_BYTES", str(25 * 1024 * 1024)))
+IMPORT_MAX_TEXT_BYTES = int(os.getenv("IMPORT_MAX_TEXT_BYTES", str(200 * 1024 * 1024)))  # After decompression
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "500"))
+IMPORT_PROGRESS_SECONDS = float(os.getenv("IMPORT_PROGRESS_SECONDS", "5"))
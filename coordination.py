@@ -0,0 +1,164 @@
+import asyncio
+import hashlib
+import logging
+import os
+import socket
+import time
+import uuid
+from datetime import timedelta
+from config import COORDINATION_GROUP, LEASE_TTL_SECONDS, LEASE_RENEW_SECONDS, LEASE_PARTITIONS, SHARD_IDS
+from scheduler import utcnow
+
+def partition_of(user_id):
+    return user_id % LEASE_PARTITIONS
+
+def rendezvous_owner(partition, members):
+    """The member with the highest hash for `partition` (rendezvous / highest-random-weight hashing).
+
+    When a member joins or leaves, only the partitions it wins or held move.
+    """
+    return max(members, key=lambda member: hashlib.sha1(f"{member}:{partition}".encode()).digest())
+
+class Coordinator:
+    """Splits reminder work across live bot instances using lease documents in MongoDB.
+
+    Every instance upserts a lease in the `leases` collection every LEASE_RENEW_SECONDS,
+    valid for LEASE_TTL_SECONDS (a TTL index cleans up leases of dead instances). The live
+    members of COORDINATION_GROUP split LEASE_PARTITIONS user partitions between them by
+    rendezvous hashing. Processes running different SHARD_IDS form separate groups, since
+    each only serves its own shards' users. A crashed instance's partitions move once its
+    lease expires; a stopping instance deletes its lease so they move on the next renewal.
+
+    An instance only acts while its own lease is valid, so one that loses MongoDB stops
+    sending before the others take over its users. Partitions an instance loses are
+    released at once, but ones it gains are only taken over after LEASE_TTL_SECONDS:
+    by then every other member has either renewed and seen the new membership or let
+    its lease lapse, so no partition is served by two processes at once. After taking
+    partitions over the bot dispatches `partitions_changed` so cogs can load their reminders.
+    """
+
+    def __init__(self, aurabot):
+        self.aurabot = aurabot
+        self.instance_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.group = COORDINATION_GROUP
+        if SHARD_IDS is not None:
+            self.group += ":shards=" + ",".join(map(str, sorted(SHARD_IDS)))
+        self.members = []
+        self.partitions = frozenset()  # Partitions acted on now
+        self.pending = frozenset()  # Partitions gained but not yet taken over
+        self._valid_until = 0  # Monotonic time our lease is known to be valid until
+        self._task = None
+        self._handover = None
+
+    @property
+    def leases(self):
+        return self.aurabot.db.leases
+
+    async def start(self):
+        try:
+            await self._renew()
+        except Exception as e:
+            logging.warning(f"Could not acquire a lease yet; not handling reminders until one is held: {e}")
+        if not self._task:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        if self._handover:
+            self._handover.cancel()
+            self._handover = None
+        self._valid_until = 0
+        try:
+            # Hand our partitions over now instead of when the lease expires
+            await self.leases.delete_one({"_id": self.instance_id})
+        except Exception as e:
+            logging.warning(f"Could not release lease {self.instance_id}: {e}")
+
+    def lease_valid(self):
+        return time.monotonic() < self._valid_until
+
+    def owns(self, user_id):
+        return self.lease_valid() and partition_of(user_id) in self.partitions
+
+    def query_filter(self, field="_id"):
+        """Query fragment matching the users whose partitions this instance holds."""
+        if not self.lease_valid() or not self.partitions:
+            return {field: {"$in": []}}  # Matches nothing
+        if len(self.partitions) == LEASE_PARTITIONS:
+            return {}
+        return {"$or": [{field: {"$mod": [LEASE_PARTITIONS, p]}} for p in sorted(self.partitions)]}
+
+    def stats(self):
+        return {
+            "instance": self.instance_id,
+            "members": len(self.members),
+            "partitions": len(self.partitions),
+            "pending_partitions": len(self.pending),
+            "lease_valid": self.lease_valid(),
+        }
+
+    async def _renew(self):
+        was_valid = self.lease_valid()
+        started = time.monotonic()
+        now = utcnow()
+        await self.leases.update_one(
+            {"_id": self.instance_id},
+            {"$set": {
+                "group": self.group,
+                "renewed_at": now,
+                "expires_at": now + timedelta(seconds=LEASE_TTL_SECONDS),
+            }},
+            upsert=True
+        )
+        # Measured from before the write, so we stop acting no later than the others see us expire
+        self._valid_until = started + LEASE_TTL_SECONDS
+
+        # Live members decide by expires_at; the TTL monitor only deletes about once a minute
+        live = self.leases.find({"group": self.group, "expires_at": {"$gt": now}}, {"_id": 1})
+        members = sorted([lease["_id"] async for lease in live])
+        if self.instance_id not in members:
+            members = sorted(members + [self.instance_id])
+
+        if members != self.members or not was_valid:
+            self.members = members
+            share = frozenset(
+                p for p in range(LEASE_PARTITIONS) if rendezvous_owner(p, members) == self.instance_id
+            )
+            if self._handover:
+                self._handover.cancel()
+                self._handover = None
+
+            if len(members) == 1:
+                # No other live lease, so nobody else is acting on any partition
+                self.partitions, self.pending = share, frozenset()
+            else:
+                # Release at once; partitions held while our lease had lapsed count as gained
+                self.partitions = share & self.partitions if was_valid else frozenset()
+                self.pending = share - self.partitions
+            logging.info(
+                f"Coordination: {len(members)} live instance(s); {self.instance_id} holds "
+                f"{len(self.partitions)}/{LEASE_PARTITIONS} partitions, taking over {len(self.pending)} "
+                f"in {LEASE_TTL_SECONDS}s"
+            )
+            if self.pending:
+                self._handover = asyncio.create_task(self._take_over(share))
+            elif len(members) == 1:
+                self.aurabot.dispatch("partitions_changed")
+
+    async def _take_over(self, share):
+        """Start acting on gained partitions once their previous holders have had to let go."""
+        await asyncio.sleep(LEASE_TTL_SECONDS)
+        self.partitions, self.pending = share, frozenset()
+        self._handover = None
+        logging.info(f"Coordination: {self.instance_id} took over its partitions ({len(share)}/{LEASE_PARTITIONS})")
+        self.aurabot.dispatch("partitions_changed")
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(LEASE_RENEW_SECONDS)
+            try:
+                await self._renew()
+            except Exception as e:
+                logging.warning(f"Lease renewal failed (lease valid: {self.lease_valid()}): {e}")
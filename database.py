@@ -0,0 +1,85 @@
+import asyncio
+import logging
+from motor.motor_asyncio import AsyncIOMotorClient
+from config import (
+    MONGO_URL,
+    MONGO_DB_NAME,
+    MONGO_MAX_POOL_SIZE,
+    MONGO_MIN_POOL_SIZE,
+    MONGO_SERVER_SELECTION_TIMEOUT_MS,
+    MONGO_CONNECT_TIMEOUT_MS,
+    MONGO_SOCKET_TIMEOUT_MS,
+)
+
+class Database:
+    """Shared async MongoDB data layer owned by AuraBot and handed to every cog."""
+
+    def __init__(self):
+        if not MONGO_URL:
+            raise ValueError("MongoDB connection string is not set in .env")
+
+        # One client means one connection pool for the whole bot
+        self.client = AsyncIOMotorClient(
+            MONGO_URL,
+            maxPoolSize=MONGO_MAX_POOL_SIZE,
+            minPoolSize=MONGO_MIN_POOL_SIZE,
+            serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS,
+            connectTimeoutMS=MONGO_CONNECT_TIMEOUT_MS,
+            socketTimeoutMS=MONGO_SOCKET_TIMEOUT_MS,
+        )
+        self.db = self.client[MONGO_DB_NAME]
+
+        # Collections used by the cogs
+        self.user_profiles = self.db["user_profiles"]
+        self.habit_tracking = self.db["habit_tracking"]
+        self.goal_tracking = self.db["goal_tracking"]
+        self.points_ledger = self.db["points_ledger"]  # Append-only point events, see points.py
+        self.name_index = self.db["name_index"]  # Goal/habit names for autocomplete, see names.py
+        self.mood_logging = self.db["mood_logging"]
+        self.leases = self.db["leases"]  # Instance leases, see coordination.py
+        self.mood_entries = self.db["mood_entries"]  # Monthly mood buckets, see moodstore.py
+        self.mood_rollups = self.db["mood_rollups"]  # Yearly mood rollup arrays, see moodtrends.py
+        self.mood_backfills = self.db["mood_backfills"]  # Per-user rollup backfill markers, see moodtrends.py
+
+    async def ping(self):
+        """Non-blocking health check. Returns True if MongoDB answered in time."""
+        timeout = MONGO_SERVER_SELECTION_TIMEOUT_MS / 1000
+        try:
+            await asyncio.wait_for(self.client.admin.command("ping"), timeout=timeout)
+            return True
+        except Exception as e:
+            logging.error(f"MongoDB health check failed: {e}")
+            return False
+
+    async def ensure_indexes(self):
+        """Create the indexes the cogs' queries rely on. Safe to run on every start."""
+        # Mood reminders: one indexed lookup per minute for the users due in that UTC slot
+        await self.mood_logging.create_index("reminder_slot", sparse=True)
+        await self.mood_logging.create_index("reminder_slot_expires", sparse=True)
+
+        # Nightly streak repair finds items whose last logged day has passed
+        await self.habit_tracking.create_index("habits.stats.last")
+        await self.goal_tracking.create_index("goals.stats.last")
+
+        # Habit reminder reload: users whose habits were added to since the last sync
+        await self.habit_tracking.create_index("habits_updated_at", sparse=True)
+
+        # Goal deadline sweep: unreminded goals due within the window
+        await self.goal_tracking.create_index([("goals.reminded", 1), ("goals.deadline_at", 1)])
+
+        # Points ledger, read per user in time order
+        await self.points_ledger.create_index([("user_id", 1), ("at", 1)])
+
+        # Instance leases: live members by group, dead ones removed by the TTL monitor
+        await self.leases.create_index([("group", 1), ("expires_at", 1)])
+        await self.leases.create_index("expires_at", expireAfterSeconds=0)
+
+        # Mood history: one bucket per user per month, read by time range
+        await self.mood_entries.create_index([("user_id", 1), ("month", 1)], unique=True)
+
+        # Mood rollups: one document per user per year
+        await self.mood_rollups.create_index([("user_id", 1), ("year", 1)], unique=True)
+
+    def close(self):
+        """Close the connection pool."""
+        self.client.close()
@@ -0,0 +1,152 @@
+from datetime import date, datetime, timedelta
+
+# Each year is stored as WORDS_PER_YEAR words of WORD_BITS bits (bit n = day-of-year n + 1).
+# 31-bit words keep every stored value a plain int32, which MongoDB's $bit and
+# $bitsAllSet operate on directly.
+WORD_BITS = 31
+WORDS_PER_YEAR = 12  # 372 bits >= 366 days
+DATE_FORMAT = "%Y-%m-%d"
+
+def _as_date(day):
+    if isinstance(day, str):
+        return datetime.strptime(day, DATE_FORMAT).date()
+    if isinstance(day, datetime):
+        return day.date()
+    return day
+
+def _bit_index(day):
+    return day.timetuple().tm_yday - 1
+
+def _popcount(value):
+    return bin(value).count("1")
+
+def word_path(day):
+    """Relative document path and bit mask of `day`, e.g. ("y2026.w9", 1 << 12)."""
+    day = _as_date(day)
+    index = _bit_index(day)
+    return f"y{day.year}.w{index // WORD_BITS}", 1 << (index % WORD_BITS)
+
+def not_logged_filter(day, prefix="days"):
+    """Query fragment matching a day log that doesn't contain `day` (missing words count as empty)."""
+    path, mask = word_path(day)
+    return {f"{prefix}.{path}": {"$not": {"$bitsAllSet": mask}}}
+
+def log_day_update(day, prefix):
+    """$bit update that atomically adds `day` to the day log at `prefix` (e.g. "habits.$.days")."""
+    path, mask = word_path(day)
+    return {f"{prefix}.{path}": {"or": mask}}
+
+class DayLog:
+    """A set of calendar days stored as one bitset per year.
+
+    Membership and adding a day are O(1); counts and ranges are computed with
+    mask-and-popcount over each year's bits instead of walking date strings.
+    The stored form, {"y2026": {"w0": int, ...}}, is a few dozen bytes per year.
+    """
+
+    def __init__(self, years=None):
+        self.years = years or {}  # year -> int with bit n set for day-of-year n + 1
+
+    @classmethod
+    def from_document(cls, doc, legacy_logs=None):
+        """Build from a stored day log, merging a legacy list of "%Y-%m-%d" strings if given."""
+        years = {}
+        for year_key, words in (doc or {}).items():
+            bits = 0
+            for word_key, value in words.items():
+                bits |= int(value) << (int(word_key[1:]) * WORD_BITS)
+            years[int(year_key[1:])] = bits
+        log = cls(years)
+        for day in legacy_logs or ():
+            log.add(day)
+        return log
+
+    @classmethod
+    def from_strings(cls, days):
+        return cls.from_document(None, days)
+
+    def to_document(self):
+        doc = {}
+        for year, bits in sorted(self.years.items()):
+            words = {}
+            for i in range(WORDS_PER_YEAR):
+                value = (bits >> (i * WORD_BITS)) & ((1 << WORD_BITS) - 1)
+                if value:
+                    words[f"w{i}"] = value
+            if words:
+                doc[f"y{year}"] = words
+        return doc
+
+    def to_strings(self):
+        return [day.strftime(DATE_FORMAT) for day in self]
+
+    def add(self, day):
+        day = _as_date(day)
+        self.years[day.year] = self.years.get(day.year, 0) | (1 << _bit_index(day))
+
+    def __contains__(self, day):
+        day = _as_date(day)
+        return bool(self.years.get(day.year, 0) >> _bit_index(day) & 1)
+
+    def __len__(self):
+        return sum(_popcount(bits) for bits in self.years.values())
+
+    def __iter__(self):
+        """Days in ascending order."""
+        for year in sorted(self.years):
+            bits = self.years[year]
+            start = date(year, 1, 1)
+            while bits:
+                low = bits & -bits
+                yield start + timedelta(days=low.bit_length() - 1)
+                bits ^= low
+
+    def count_range(self, start, end):
+        """Number of logged days in the inclusive range [start, end]."""
+        start, end = _as_date(start), _as_date(end)
+        total = 0
+        for year in range(start.year, end.year + 1):
+            bits = self.years.get(year, 0)
+            if not bits:
+                continue
+            first = _bit_index(start) if year == start.year else 0
+            last = _bit_index(end) if year == end.year else WORDS_PER_YEAR * WORD_BITS - 1
+            mask = ((1 << (last - first + 1)) - 1) << first
+            total += _popcount(bits & mask)
+        return total
+
+    def last_day(self):
+        """Most recent logged day, or None."""
+        for year in sorted(self.years, reverse=True):
+            bits = self.years[year]
+            if bits:
+                return date(year, 1, 1) + timedelta(days=bits.bit_length() - 1)
+        return None
+
+async def migrate_string_logs(collection, array, name_field, logs_field):
+    """
+    Convert legacy "%Y-%m-%d" string lists at `array`.`logs_field` into `days` bitsets.
+    Each item is migrated by one targeted update that ORs the bits in and drops the list,
+    so it is safe alongside concurrent logging and safe to re-run.
+    """
+    migrated = 0
+    query = {f"{array}.{logs_field}": {"$exists": True}}
+    projection = {f"{array}.{name_field}": 1, f"{array}.{logs_field}": 1}
+    async for doc in collection.find(query, projection):
+        for item in doc.get(array, []):
+            if logs_field not in item:
+                continue
+            update = {"$unset": {f"{array}.$.{logs_field}": ""}}
+            bits = {
+                f"{array}.$.days.{year_key}.{word_key}": {"or": value}
+                for year_key, words in DayLog.from_strings(item[logs_field]).to_document().items()
+                for word_key, value in words.items()
+            }
+            if bits:
+                update["$bit"] = bits
+            await collection.update_one(
+                {"_id": doc["_id"], array: {"$elemMatch": {name_field: item[name_field], logs_field: {"$exists": True}}}},
+                update
+            )
+            migrated += 1
+    return migrated
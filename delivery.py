@@ -0,0 +1,184 @@
+import asyncio
+import logging
+import time
+from collections import deque
+import discord
+from cache import DMChannelCache
+from config import (
+    DM_WORKERS,
+    DM_QUEUE_SIZE,
+    DM_RATE_PER_SECOND,
+    DM_CHANNEL_INTERVAL_SECONDS,
+    DM_MAX_ATTEMPTS,
+    DM_CLOSED_COOLDOWN_HOURS,
+    DM_STATS_INTERVAL_SECONDS,
+)
+
+class TokenBucket:
+    """Async token bucket allowing `rate` acquisitions per second with short bursts."""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(rate, 1)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+
+    async def acquire(self):
+        while True:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            await asyncio.sleep((1 - self._tokens) / self.rate)
+
+class DMDelivery:
+    """Bounded worker pool that delivers reminder DMs off the scheduler's path.
+
+    Reminders are queued with `enqueue` and sent by DM_WORKERS workers, which
+    resolve DM channels through a DMChannelCache. Sends are
+    paced by a global token bucket plus a per-channel interval (Discord's message
+    route is bucketed per channel), 429s back off for the returned retry_after,
+    and users with closed DMs are skipped for DM_CLOSED_COOLDOWN_HOURS so repeated
+    403s don't count against the invalid-request limit. A DM queued with `on_failed`
+    has that coroutine function awaited if it ends up not being delivered.
+    """
+
+    def __init__(self, aurabot):
+        self.aurabot = aurabot
+        self.queue = asyncio.Queue(maxsize=DM_QUEUE_SIZE)
+        self.channels = DMChannelCache(aurabot)
+        self._global_bucket = TokenBucket(DM_RATE_PER_SECOND)
+        self._channel_free_at = {}  # channel id -> monotonic time its route bucket frees up
+        self._closed_until = {}  # user id -> monotonic time until which DMs are skipped
+        self._latencies = deque(maxlen=1000)  # Seconds from enqueue to delivery
+        self._tasks = []
+
+        # Counters
+        self.sent = 0
+        self.failed = 0
+        self.skipped = 0
+        self.rate_limited = 0
+
+    def start(self):
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._worker()) for _ in range(DM_WORKERS)]
+            self._tasks.append(asyncio.create_task(self._report_stats()))
+
+    def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+
+    def dms_closed(self, user_id):
+        """True while a user is in the closed-DM cool-down."""
+        until = self._closed_until.get(user_id)
+        if until is None:
+            return False
+        if until <= time.monotonic():
+            del self._closed_until[user_id]
+            return False
+        return True
+
+    async def enqueue(self, user_id, content, on_failed=None):
+        """
+        Queue a DM. Returns False if the user is skipped because their DMs are closed;
+        otherwise `on_failed`, if given, is awaited should the DM later fail to send.
+        """
+        if self.dms_closed(user_id):
+            self.skipped += 1
+            return False
+        await self.queue.put((user_id, content, time.monotonic(), on_failed))
+        return True
+
+    def stats(self):
+        """Queue depth, counters and send latency percentiles (in seconds)."""
+        latencies = sorted(self._latencies)
+
+        def percentile(p):
+            return round(latencies[int(p * (len(latencies) - 1))], 3) if latencies else None
+
+        return {
+            "queue_depth": self.queue.qsize(),
+            "sent": self.sent,
+            "failed": self.failed,
+            "skipped": self.skipped,
+            "rate_limited": self.rate_limited,
+            "closed_dms": len(self._closed_until),
+            "latency_p50": percentile(0.5),
+            "latency_p95": percentile(0.95),
+            "dm_channel_cache": self.channels.stats(),
+        }
+
+    async def _worker(self):
+        while True:
+            user_id, content, queued_at, on_failed = await self.queue.get()
+            try:
+                delivered = False
+                try:
+                    delivered = await self._deliver(user_id, content, queued_at)
+                except Exception as e:
+                    self.failed += 1
+                    logging.error(f"Error delivering DM to user {user_id}: {e}")
+                if not delivered and on_failed is not None:
+                    await on_failed()
+            except Exception as e:
+                logging.error(f"Error handling failed DM to user {user_id}: {e}")
+            finally:
+                self.queue.task_done()
+
+    async def _wait_for_channel(self, channel_id):
+        delay = self._channel_free_at.get(channel_id, 0) - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        self._channel_free_at[channel_id] = time.monotonic() + DM_CHANNEL_INTERVAL_SECONDS
+
+    async def _deliver(self, user_id, content, queued_at):
+        """Send one DM with retries; returns whether it was delivered."""
+        for attempt in range(DM_MAX_ATTEMPTS):
+            await self._global_bucket.acquire()
+            channel = await self.channels.get(user_id)
+            await self._wait_for_channel(channel.id)
+            try:
+                await channel.send(content)
+            except discord.Forbidden:
+                self.channels.invalidate(user_id)
+                self._closed_until[user_id] = time.monotonic() + DM_CLOSED_COOLDOWN_HOURS * 3600
+                self.skipped += 1
+                logging.warning(f"Failed to send reminder to user {user_id} (DMs may be disabled).")
+                return False
+            except discord.HTTPException as e:
+                if e.status == 429:
+                    self.rate_limited += 1
+                    retry_after = getattr(e, "retry_after", None) or 2 ** attempt
+                    self._channel_free_at[channel.id] = time.monotonic() + retry_after
+                    continue
+                if e.status >= 500:
+                    await asyncio.sleep(2 ** attempt)
+                    continue
+                if e.status == 404:
+                    self.channels.invalidate(user_id)  # Channel or user no longer exists
+                raise
+            self.sent += 1
+            self._latencies.append(time.monotonic() - queued_at)
+            return True
+        self.failed += 1
+        logging.error(f"Giving up on reminder to user {user_id} after {DM_MAX_ATTEMPTS} attempts.")
+        return False
+
+    async def _report_stats(self):
+        last_reported = None
+        while True:
+            await asyncio.sleep(DM_STATS_INTERVAL_SECONDS)
+
+            # Forget route buckets that have freed up so the map stays small
+            now = time.monotonic()
+            self._channel_free_at = {
+                channel_id: free_at for channel_id, free_at in self._channel_free_at.items() if free_at > now
+            }
+
+            stats = self.stats()
+            if stats != last_reported:
+                logging.info(f"DM delivery stats: {stats}")
+                last_reported = stats
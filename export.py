@@ -0,0 +1,182 @@
+import csv
+import io
+import json
+import zlib
+from datetime import date, datetime, timezone
+from daylog import DayLog
+from moodstore import MoodStore
+from points import PointsLedger
+from streaks import item_stats
+
+# Fields of each record type. NDJSON lines carry them plus "type"; CSV gets one file per type
+EXPORT_COLUMNS = {
+    "profile": ["username", "timezone"],
+    "mood": ["logged_at", "timestamp", "mood", "score"],
+    "habit": ["habit", "reminder_time", "total", "current", "longest", "last"],
+    "habit_log": ["habit", "day"],
+    "goal": ["goal", "deadline", "completed", "total", "current", "longest", "last"],
+    "goal_progress": ["goal", "day"],
+    "points": ["balance", "stored"],
+    "points_event": ["at", "amount", "reason", "goal"],
+}
+EXPORT_FORMATS = ("ndjson", "csv")
+
+# Uncompressed text compressed at a time; a part is closed before a block could overflow it
+BLOCK_BYTES = 64 * 1024
+
+# Cursor batch size for the streamed collections
+CURSOR_BATCH_SIZE = 500
+
+# Tracked items: (collection, array, name field, legacy string-log field, item type, day type, extra fields)
+_TRACKED = (
+    ("habit_tracking", "habits", "habit", "logs", "habit", "habit_log", ("reminder_time",)),
+    ("goal_tracking", "goals", "goal", "progress", "goal", "goal_progress", ("deadline", "completed")),
+)
+
+def _iso(value):
+    if isinstance(value, datetime):
+        return value.replace(tzinfo=value.tzinfo or timezone.utc).isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+async def _items(collection, user_id, array):
+    """The user's habits or goals one at a time, so a large document arrives in cursor batches."""
+    pipeline = [
+        {"$match": {"_id": user_id}},
+        {"$unwind": f"${array}"},
+        {"$replaceRoot": {"newRoot": f"${array}"}},
+    ]
+    async for item in collection.aggregate(pipeline, batchSize=CURSOR_BATCH_SIZE):
+        yield item
+
+async def export_records(db, user_id):
+    """
+    Yield (type, record) for everything stored about the user, grouped by type in
+    EXPORT_COLUMNS order. Reads one mood bucket, item or ledger batch at a time.
+    """
+    profile = await db.user_profiles.find_one({"_id": user_id}, {"_id": 0})
+    if profile:
+        yield "profile", profile
+
+    moods = MoodStore(db)
+    await moods.migrate_user(user_id)  # Moods still in the legacy layout are exported too
+    async for entry in moods.entries(user_id):
+        yield "mood", {
+            "logged_at": _iso(entry["logged_at"]), "timestamp": entry.get("timestamp"),
+            "mood": entry.get("mood"), "score": entry.get("score"),
+        }
+
+    for collection, array, name_field, legacy_field, item_type, day_type, fields in _TRACKED:
+        collection = db[collection]
+        async for item in _items(collection, user_id, array):
+            record = {item_type: item.get(name_field), **{field: item.get(field) for field in fields}}
+            record.update(item_stats(item))
+            yield item_type, record
+        # Second pass so each type's records stay together
+        async for item in _items(collection, user_id, array):
+            for day in DayLog.from_document(item.get("days"), item.get(legacy_field)):
+                yield day_type, {item_type: item.get(name_field), "day": day.isoformat()}
+
+    ledger = PointsLedger(db)
+    stored = await db.goal_tracking.find_one({"_id": user_id}, {"points": 1})
+    if stored:
+        yield "points", {"balance": await ledger.current_balance(user_id), "stored": stored.get("points", 0)}
+    events = db.points_ledger.find(
+        {"user_id": user_id}, {"_id": 0, "at": 1, "amount": 1, "reason": 1, "goal": 1},
+        batch_size=CURSOR_BATCH_SIZE
+    ).sort("at", 1)
+    async for event in events:
+        yield "points_event", dict(event, at=_iso(event.get("at")))
+
+def _ndjson_line(record_type, record):
+    return json.dumps({"type": record_type, **record}, default=_iso, ensure_ascii=False) + "\n"
+
+def _csv_line(values):
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(["" if value is None else _iso(value) for value in values])
+    return buffer.getvalue()
+
+class GzipParts:
+    """Gzips text lines into numbered .gz files of at most `limit` bytes each.
+
+    Every part is a complete gzip file that starts with `header`, so parts can be
+    opened on their own. Lines are compressed in BLOCK_BYTES blocks with a sync
+    flush after each, so the compressed size is always known and a part is closed
+    before the next block could push it over the limit. Only the current part is
+    held in memory.
+    """
+
+    def __init__(self, name, limit, header=""):
+        self.name = name
+        self.limit = limit
+        self.header = header.encode()
+        self.number = 0
+        self._block, self._block_size = [], 0
+        self._new_part()
+
+    def _new_part(self):
+        self.number += 1
+        self._compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31: gzip container
+        self._data = bytearray(self._compressor.compress(self.header))
+        self._rows = 0  # Rows compressed into this part
+
+    def _finish_part(self):
+        stem, _, extension = self.name.rpartition(".")
+        self._data += self._compressor.flush(zlib.Z_FINISH)
+        return f"{stem}-{self.number:03d}.{extension}.gz", bytes(self._data)
+
+    def _flush_block(self):
+        """Compress the pending block; returns the part it completed, if any."""
+        finished = []
+        data = "".join(self._block).encode()
+        rows = len(self._block)
+        self._block, self._block_size = [], 0
+        # Deflate grows incompressible data by a few bytes per 16 KB; the rest covers the
+        # header still buffered in the compressor and the gzip trailer
+        if self._rows and len(self._data) + len(data) + len(data) // 1000 + len(self.header) + 64 > self.limit:
+            finished.append(self._finish_part())
+            self._new_part()
+        self._data += self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+        self._rows += rows
+        return finished
+
+    def write(self, line):
+        """Add a line; returns the (filename, bytes) parts it completed."""
+        self._block.append(line)
+        self._block_size += len(line)
+        if self._block_size >= BLOCK_BYTES:
+            return self._flush_block()
+        return []
+
+    def close(self):
+        """Finish the last part; returns the (filename, bytes) parts still pending."""
+        finished = self._flush_block() if self._block else []
+        if self._rows:
+            finished.append(self._finish_part())
+        return finished
+
+async def export_parts(db, user_id, fmt, limit):
+    """
+    Yield the user's export as (filename, gzip bytes) parts of at most `limit` bytes:
+    one NDJSON stream, or one CSV file per record type.
+    """
+    writer = None
+    async for record_type, record in export_records(db, user_id):
+        name = "aurabot-export.ndjson" if fmt == "ndjson" else f"aurabot-{record_type}.csv"
+        if writer is None or writer.name != name:
+            if writer:
+                for part in writer.close():
+                    yield part
+            header = _csv_line(EXPORT_COLUMNS[record_type]) if fmt == "csv" else ""
+            writer = GzipParts(name, limit, header)
+
+        if fmt == "csv":
+            line = _csv_line([record.get(column) for column in EXPORT_COLUMNS[record_type]])
+        else:
+            line = _ndjson_line(record_type, record)
+        for part in writer.write(line):
+            yield part
+    if writer:
+        for part in writer.close():
+            yield part
@@ -0,0 +1,39 @@
+import logging
+from aiohttp import web
+
+class HealthServer:
+    """HTTP endpoints an external supervisor can poll.
+
+    GET /healthz  200 unless startup failed (liveness)
+    GET /readyz   200 once the bot is ready to serve commands, 503 before (readiness)
+
+    Both return AuraBot.startup_report() as JSON.
+    """
+
+    def __init__(self, aurabot, host, port):
+        self.aurabot = aurabot
+        self.host = host
+        self.port = port
+        self._runner = None
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get("/healthz", self.healthz)
+        app.router.add_get("/readyz", self.readyz)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        logging.info(f"Health endpoints listening on {self.host}:{self.port}")
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def healthz(self, request):
+        report = self.aurabot.startup_report()
+        return web.json_response(report, status=503 if report["state"] == "failed" else 200)
+
+    async def readyz(self, request):
+        report = self.aurabot.startup_report()
+        return web.json_response(report, status=200 if report["state"] in ("ready", "degraded") else 503)
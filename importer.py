@@ -0,0 +1,460 @@
+import codecs
+import csv
+import json
+import zlib
+from datetime import datetime, timedelta, timezone
+import aiohttp
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from config import IMPORT_MAX_TEXT_BYTES
+from daylog import DATE_FORMAT, DayLog, log_day_update
+from export import EXPORT_COLUMNS
+from moodstore import month_start
+from moodtrends import MoodRollups
+from scheduler import utcnow
+from streaks import EMPTY_STATS, stats_from_daylog
+
+# Record types /importdata writes; the rest of an export (profile, points) is skipped
+IMPORT_TYPES = ("habit", "goal", "habit_log", "goal_progress", "mood")
+SKIPPED_TYPES = ("profile", "points", "points_event")
+
+# Same limits as /addhabit and /creategoal; moods are capped well above what /logmood accepts
+MAX_NAME_LENGTH = 100
+MAX_IMPORTED_MOOD_LENGTH = 1000
+
+# Row errors listed in the final report; the rest are only counted
+MAX_REPORTED_ERRORS = 15
+
+READ_CHUNK_BYTES = 64 * 1024
+
+# Longest line, or CSV record spanning lines, that is parsed; longer ones are row errors
+MAX_LINE_CHARS = 64 * 1024
+
+# kind -> (collection, name field, legacy string-log field, item type, day type)
+KINDS = {
+    "habits": ("habit_tracking", "habit", "logs", "habit", "habit_log"),
+    "goals": ("goal_tracking", "goal", "progress", "goal", "goal_progress"),
+}
+_KIND_OF_TYPE = {types[index]: kind for kind, types in KINDS.items() for index in (3, 4)}
+
+class RowError(ValueError):
+    """A row that can't be imported; the message is shown to the user with its line number."""
+
+def import_format(filename):
+    """"csv" or "ndjson" from an attachment's file name (optionally .gz), or None."""
+    name = filename.lower().removesuffix(".gz")
+    if name.endswith(".csv"):
+        return "csv"
+    if name.endswith((".ndjson", ".jsonl", ".json")):
+        return "ndjson"
+    return None
+
+class _LineSplitter:
+    """Splits decoded text into lines, replacing any line over MAX_LINE_CHARS with a RowError."""
+
+    def __init__(self):
+        self.pending = ""
+        self.oversize = False
+
+    def feed(self, text):
+        lines = text.split("\n")
+        items = []
+        for line in lines[:-1]:
+            if self.oversize or len(self.pending) + len(line) > MAX_LINE_CHARS:
+                items.append(RowError(f"line is longer than {MAX_LINE_CHARS} characters"))
+            else:
+                items.append(self.pending + line)
+            self.pending, self.oversize = "", False
+        if not self.oversize:
+            self.pending += lines[-1]
+            if len(self.pending) > MAX_LINE_CHARS:
+                self.pending, self.oversize = "", True  # Drop the rest of this line as it arrives
+        return items
+
+    def finish(self):
+        return self.feed("\n") if self.pending or self.oversize else []
+
+def _expand(decompressor, chunk):
+    """Decompress `chunk` in READ_CHUNK_BYTES pieces, so a highly compressed chunk never expands at once."""
+    data = decompressor.decompress(chunk, READ_CHUNK_BYTES)
+    while data:
+        yield data
+        data = decompressor.decompress(decompressor.unconsumed_tail, READ_CHUNK_BYTES)
+
+async def attachment_lines(url, gzipped, max_text_bytes=IMPORT_MAX_TEXT_BYTES):
+    """
+    Yield the text lines of a (gzipped) attachment as it downloads. Memory stays bounded
+    however the file is laid out: a line over MAX_LINE_CHARS is yielded as a RowError
+    in its place, and once the text passes `max_text_bytes` a RowError ends the file.
+    """
+    decompressor = zlib.decompressobj(47) if gzipped else None  # wbits 47: gzip or zlib header
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    splitter = _LineSplitter()
+    total = 0
+    async with aiohttp.ClientSession() as session:
+        async with session.get(url) as response:
+            response.raise_for_status()
+            async for chunk in response.content.iter_chunked(READ_CHUNK_BYTES):
+                for data in _expand(decompressor, chunk) if decompressor else (chunk,):
+                    total += len(data)
+                    if total > max_text_bytes:
+                        yield RowError(
+                            f"the file expands to more than {max_text_bytes // (1024 * 1024)} MiB; "
+                            "split it into smaller imports"
+                        )
+                        return
+                    for line in splitter.feed(decoder.decode(data)):
+                        yield line
+    for line in splitter.feed(decoder.decode(b"", final=True)) + splitter.finish():
+        yield line
+
+class _RecordFeed:
+    """Iterator one csv.reader reads from; parse_rows only adds complete records to it."""
+
+    def __init__(self):
+        self.records = []
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return self.records.pop()
+
+async def parse_rows(lines, fmt):
+    """
+    Yield (line number, type, record) for each non-blank line, or each CSV record, which
+    may span lines when a quoted field holds newlines. A CSV file holds one record type,
+    named by a "type" column or recognised from its header row; a row that can't be
+    parsed is yielded with type None and the error message as record.
+    """
+    feed = _RecordFeed()
+    reader = csv.reader(feed)
+    header = header_type = None
+    record_lines, record_start, quotes, size = [], None, 0, 0
+    line_number = 0
+    async for line in lines:
+        line_number += 1
+        if isinstance(line, RowError):
+            record_lines, quotes, size = [], 0, 0  # Drop a record the bad line was part of
+            yield line_number, None, str(line)
+            continue
+        line = line.rstrip("\r")
+        if not record_lines and not line.strip():
+            continue
+        try:
+            if fmt == "ndjson":
+                start = line_number
+                record = json.loads(line)
+                if not isinstance(record, dict):
+                    raise RowError("each line must be a JSON object")
+                record_type = record.pop("type", None)
+            else:
+                # An odd number of quotes so far means a quoted field continues on the next line
+                if not record_lines:
+                    record_start = line_number
+                record_lines.append(line)
+                quotes += line.count('"')
+                size += len(line)
+                if quotes % 2:
+                    if size > MAX_LINE_CHARS:
+                        yield record_start, None, f"unterminated quoted field longer than {MAX_LINE_CHARS} characters"
+                        return
+                    continue
+                start = record_start
+                feed.records.append("\n".join(record_lines) + "\n")
+                record_lines, quotes, size = [], 0, 0
+                values = next(reader)
+
+                if header is None:
+                    header_type = next((t for t, columns in EXPORT_COLUMNS.items() if set(columns) == set(values)), None)
+                    if "type" not in values and header_type is None:
+                        yield start, None, "unrecognised CSV header; use the columns of an /exportdata CSV file"
+                        return
+                    header = values
+                    continue
+                if len(values) != len(header):
+                    raise RowError(f"expected {len(header)} columns, found {len(values)}")
+                record = dict(zip(header, values))
+                record_type = record.pop("type", header_type)
+            if not record_type:
+                raise RowError("missing record `type`")
+            yield start, record_type, record
+        except (RowError, ValueError, csv.Error) as e:
+            yield start, None, str(e)
+    if record_lines:
+        yield record_start, None, "unterminated quoted field at the end of the file"
+
+def _text(record, field, required=True, limit=MAX_NAME_LENGTH):
+    value = record.get(field)
+    value = "" if value is None else str(value).strip()
+    if required and not value:
+        raise RowError(f"`{field}` is required")
+    if len(value) > limit:
+        raise RowError(f"`{field}` can be at most {limit} characters")
+    return value
+
+def _day(record, field, latest=None):
+    text = _text(record, field)
+    try:
+        day = datetime.strptime(text, DATE_FORMAT).date()
+    except ValueError:
+        raise RowError(f"`{field}` must be a YYYY-MM-DD date")
+    if day.year < 1970 or (latest and day > latest):
+        raise RowError(f"`{field}` {text} is out of range")
+    return day
+
+def _flag(record, field):
+    value = record.get(field)
+    if isinstance(value, bool) or value is None:
+        return bool(value)
+    text = str(value).strip().lower()
+    if text in ("", "false", "0", "no"):
+        return False
+    if text in ("true", "1", "yes"):
+        return True
+    raise RowError(f"`{field}` must be true or false")
+
+class Importer:
+    """Validates imported rows and writes them in unordered, idempotent bulk writes.
+
+    Rows are queued per collection and written every `batch_size` rows with
+    `bulk_write(ordered=False)`, new habits and goals before the day logs that
+    may refer to them. Every write is a no-op when its data is already there:
+    items are pushed only if no item has that name, days are OR-ed into the
+    bitsets, and a mood is pushed only if its bucket has no entry with the same
+    time and text. Streak counters and mood rollups are recomputed in `finish`.
+    """
+
+    QUEUE_ORDER = ("habits", "goals", "habit_log", "goal_progress", "mood")
+
+    def __init__(self, db, user_id, tz, names, batch_size):
+        self.db = db
+        self.user_id = user_id
+        self.tz = tz
+        self.names = {kind: set(existing) for kind, existing in names.items()}  # Known item names
+        self.batch_size = batch_size
+        self.today = utcnow().date()
+        self._queues = {}  # queue name -> [(line number, operation)]
+        self._queued = 0
+        self._parents = set()  # Tracking collections whose user document is known to exist
+
+        self.rows = 0
+        self.written = 0
+        self.unchanged = 0
+        self.skipped = 0
+        self.error_count = 0
+        self.errors = []  # (line number, message), the first MAX_REPORTED_ERRORS
+        self.new_items = {kind: [] for kind in KINDS}
+        self.logged = {kind: set() for kind in KINDS}
+        self.moods_written = False
+
+    def error(self, line_number, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line_number, message))
+
+    async def add(self, line_number, record_type, record):
+        """Validate one parsed row and queue its write. Returns True when a batch was written."""
+        self.rows += 1
+        if record_type is None:
+            self.error(line_number, record)
+            return False
+        if record_type in SKIPPED_TYPES:
+            self.skipped += 1
+            return False
+        try:
+            if record_type not in IMPORT_TYPES:
+                raise RowError(f"unknown record type `{record_type}`")
+            queue, operation = await getattr(self, f"_{record_type}")(record)
+        except RowError as e:
+            self.error(line_number, str(e))
+            return False
+        if operation is None:
+            self.unchanged += 1  # Repeated within this file
+            return False
+
+        self._queues.setdefault(queue, []).append((line_number, operation))
+        self._queued += 1
+        if self._queued >= self.batch_size:
+            await self.flush()
+            return True
+        return False
+
+    async def _ensure_parent(self, kind):
+        # Item pushes match on the user's document, so it has to exist first
+        collection = KINDS[kind][0]
+        if collection not in self._parents:
+            await self.db[collection].update_one({"_id": self.user_id}, {"$setOnInsert": {kind: []}}, upsert=True)
+            self._parents.add(collection)
+
+    async def _item(self, kind, record, fields):
+        _, name_field, _, _, _ = KINDS[kind]
+        name = _text(record, name_field)
+        if name in self.names[kind]:
+            return kind, None
+        await self._ensure_parent(kind)
+        item = {name_field: name, "days": {}, "stats": dict(EMPTY_STATS), **fields}
+        self.names[kind].add(name)
+        self.new_items[kind].append(item)
+        return kind, UpdateOne(
+            {"_id": self.user_id, f"{kind}.{name_field}": {"$ne": name}},
+            {"$push": {kind: item}, "$set": {f"{kind}_updated_at": utcnow()}}  # Read by the habit reminder reload
+        )
+
+    async def _habit(self, record):
+        fields = {}
+        reminder_time = _text(record, "reminder_time", required=False)
+        if reminder_time:
+            try:
+                datetime.strptime(reminder_time, "%H:%M")
+            except ValueError:
+                raise RowError("`reminder_time` must be HH:MM (24-hour clock)")
+            fields["reminder_time"] = reminder_time
+        return await self._item("habits", record, fields)
+
+    async def _goal(self, record):
+        fields = {"completed": _flag(record, "completed")}
+        if _text(record, "deadline", required=False):
+            deadline = _day(record, "deadline")
+            deadline_at = datetime(deadline.year, deadline.month, deadline.day, tzinfo=timezone.utc)
+            fields["deadline"] = deadline.strftime(DATE_FORMAT)
+            fields["deadline_at"] = deadline_at
+            # A deadline whose reminder time has passed is not reminded about after the fact
+            fields["reminded"] = deadline_at - timedelta(days=1) <= utcnow()
+        return await self._item("goals", record, fields)
+
+    async def _day_log(self, record_type, record):
+        kind = _KIND_OF_TYPE[record_type]
+        _, name_field, _, _, _ = KINDS[kind]
+        name = _text(record, name_field)
+        if name not in self.names[kind]:
+            raise RowError(f"no {name_field} named `{name}`; add it or include its `{name_field}` row first")
+        day = _day(record, "day", self.today + timedelta(days=1))  # Local dates can run a day ahead of UTC
+        self.logged[kind].add(name)
+        return record_type, UpdateOne(
+            {"_id": self.user_id, kind: {"$elemMatch": {name_field: name}}},
+            {"$bit": log_day_update(day, f"{kind}.$.days")}
+        )
+
+    async def _habit_log(self, record):
+        return await self._day_log("habit_log", record)
+
+    async def _goal_progress(self, record):
+        return await self._day_log("goal_progress", record)
+
+    async def _mood(self, record):
+        mood = _text(record, "mood", limit=MAX_IMPORTED_MOOD_LENGTH)
+        logged_at_text = _text(record, "logged_at", required=False)
+        timestamp = _text(record, "timestamp", required=False)
+        try:
+            if logged_at_text:
+                logged_at = datetime.fromisoformat(logged_at_text)
+                if logged_at.tzinfo is None:
+                    logged_at = self.tz.localize(logged_at)
+            elif timestamp:
+                logged_at = self.tz.localize(datetime.strptime(timestamp, "%Y-%m-%d %H:%M:%S"))
+            else:
+                raise RowError("`logged_at` or `timestamp` is required")
+        except ValueError:
+            raise RowError("`logged_at` must be an ISO 8601 time, `timestamp` YYYY-MM-DD HH:MM:SS")
+        # Stored with millisecond precision, so a re-import matches the stored value exactly
+        logged_at = logged_at.astimezone(timezone.utc)
+        logged_at = logged_at.replace(microsecond=logged_at.microsecond // 1000 * 1000)
+        if logged_at.year < 1970 or logged_at > utcnow() + timedelta(minutes=5):
+            raise RowError("`logged_at` is out of range")
+
+        entry = {
+            "mood": mood,
+            "timestamp": timestamp or logged_at.astimezone(self.tz).strftime("%Y-%m-%d %H:%M:%S"),
+            "logged_at": logged_at,
+            "imported": True,  # Counted into the rollups by MoodRollups.backfill_user
+        }
+        score = record.get("score")
+        if score not in (None, ""):
+            try:
+                score = int(score)
+            except (TypeError, ValueError):
+                raise RowError("`score` must be a whole number from 1 to 5")
+            if not 1 <= score <= 5:
+                raise RowError("`score` must be a whole number from 1 to 5")
+            entry["score"] = score
+
+        # Upserting a bucket that already has this entry fails on the unique (user_id, month)
+        # index; that duplicate-key error is how an already-imported mood is recognised
+        return "mood", UpdateOne(
+            {
+                "user_id": self.user_id,
+                "month": month_start(logged_at),
+                "entries": {"$not": {"$elemMatch": {"logged_at": logged_at, "mood": mood}}},
+            },
+            {"$push": {"entries": entry}},
+            upsert=True
+        )
+
+    def _collection(self, queue):
+        if queue == "mood":
+            return self.db.mood_entries
+        return self.db[KINDS[_KIND_OF_TYPE.get(queue, queue)][0]]
+
+    async def _bulk_write(self, queue, pending):
+        """Run one unordered bulk_write; returns (documents changed, [(line number, write error)])."""
+        try:
+            result = await self._collection(queue).bulk_write([operation for _, operation in pending], ordered=False)
+            return result.modified_count + result.upserted_count, []
+        except BulkWriteError as e:
+            changed = e.details.get("nModified", 0) + e.details.get("nUpserted", 0)
+            return changed, [(pending[error["index"]], error) for error in e.details.get("writeErrors", [])]
+
+    async def flush(self):
+        """Write every queued operation: one unordered bulk_write per queue, in QUEUE_ORDER."""
+        for queue in self.QUEUE_ORDER:
+            pending = self._queues.pop(queue, None)
+            if not pending:
+                continue
+            changed, failed = await self._bulk_write(queue, pending)
+            duplicates = [entry for entry, error in failed if queue == "mood" and error.get("code") == 11000]
+            if duplicates:
+                # Two new moods of one month in the same batch both try to create its bucket;
+                # once it exists, only moods that really are there already fail again
+                retried, still_failed = await self._bulk_write(queue, duplicates)
+                changed += retried
+                failed = [failure for failure in failed if failure[1].get("code") != 11000] + still_failed
+
+            for (line_number, _), error in failed:
+                if queue == "mood" and error.get("code") == 11000:
+                    continue  # Already imported
+                self.error(line_number, error.get("errmsg", "write failed"))
+            errors = sum(1 for _, error in failed if not (queue == "mood" and error.get("code") == 11000))
+            self.written += changed
+            self.unchanged += len(pending) - changed - errors
+            if queue == "mood" and changed:
+                self.moods_written = True
+        self._queued = 0
+
+    async def finish(self):
+        """Write what is still queued, then recompute streaks of logged items and the mood rollups."""
+        await self.flush()
+        for kind, names in self.logged.items():
+            if not names:
+                continue
+            collection, name_field, legacy_field, _, _ = KINDS[kind]
+            doc = await self.db[collection].find_one(
+                {"_id": self.user_id},
+                {f"{kind}.{name_field}": 1, f"{kind}.days": 1, f"{kind}.{legacy_field}": 1}
+            )
+            updates = [
+                UpdateOne(
+                    {"_id": self.user_id, f"{kind}.{name_field}": item[name_field]},
+                    {"$set": {f"{kind}.$.stats": stats_from_daylog(
+                        DayLog.from_document(item.get("days"), item.get(legacy_field))
+                    )}}
+                )
+                for item in (doc or {}).get(kind, []) if item.get(name_field) in names
+            ]
+            if updates:
+                await self.db[collection].bulk_write(updates, ordered=False)
+
+        if self.moods_written:
+            rollups = MoodRollups(self.db)
+            await rollups.start()
+            await rollups.backfill_user(self.user_id)
@@ -1,42 +1,251 @@
+import argparse
+import asyncio
+import hashlib
+import json
+import time
 import discord
 from discord.ext import commands
 import os
 from dotenv import load_dotenv
-from config import GUILD_ID  # Import GUILD_ID
+from autocomplete import quiet_expired_autocomplete
+from config import GUILD_ID, SHARD_COUNT, SHARD_IDS, COMMAND_HASH_FILE, LAZY_COGS, HEALTH_HOST, HEALTH_PORT
+from database import Database
+from cache import ProfileCache
+from names import NameIndex
+from scheduler import ReminderScheduler
+from delivery import DMDelivery
+from health import HealthServer
+from coordination import Coordinator
+from charts import ChartRenderer
 
 # Get AuraBot Token
 load_dotenv()
 TOKEN = os.getenv('DISCORD_TOKEN')
 
-class AuraBot(commands.Bot):
-    def __init__(self):
+class AuraBot(commands.AutoShardedBot):
+    def __init__(self, force_sync=False):
         intents = discord.Intents.default()
         intents.message_content = True  # Allows AuraBot to read message content
 
-        # Initialize the bot with a command prefix and intents
-        super().__init__(command_prefix="!", intents=intents)
+        # Initialize the bot with a command prefix and intents; this process runs SHARD_IDS
+        # (all shards when unset)
+        if SHARD_IDS is not None and SHARD_COUNT is None:
+            raise ValueError("SHARD_IDS requires SHARD_COUNT to be set")
+        super().__init__(command_prefix="!", intents=intents, shard_count=SHARD_COUNT, shard_ids=SHARD_IDS)
+        self.command_guild = discord.Object(id=GUILD_ID) if GUILD_ID else None  # None: global commands
+        self.db = None
+        self.profiles = None  # ProfileCache, shared so every cog sees the same invalidations
+        self.names = None  # NameIndex of goal/habit names for autocomplete
+        self.scheduler = ReminderScheduler(self)  # Shared by every reminder-sending cog
+        self.dm_delivery = DMDelivery(self)  # Sends the DMs the scheduler's reminders queue up
+        self.coordinator = Coordinator(self)  # Splits reminder users between redundant instances
+        self.charts = ChartRenderer()  # Renders /charts images off the event loop
+        self.force_sync = force_sync
+        self.health = HealthServer(self, HEALTH_HOST, HEALTH_PORT) if HEALTH_PORT else None
+        self._started_at = time.perf_counter()
+        self._ready_logged = False
 
-    async def setup_hook(self):
-        # Dynamically load all cogs from the 'cogs' folder
-        for filename in os.listdir('./cogs'):
-            if filename.endswith('.py'):
-                try:
-                    await self.load_extension(f'cogs.{filename[:-3]}')
-                except Exception as e:
-                    print(f"Failed to load cog {filename[:-3]}: {e}")
-
-        # Sync slash commands
+        # Startup state: starting -> connecting -> ready (or degraded if a lazy cog failed) / failed
+        self.state = "starting"
+        self.phases = {}  # phase name -> seconds
+        self.cog_report = {}  # cog name -> {"status", "seconds", "lazy", "error"}
+        self._lazy_task = None
+        self._lazy_done = False
+
+        # Answers to keystrokes past Discord's deadline are expected; don't log each one
+        quiet_expired_autocomplete()
+
+    def owns_user(self, user_id):
+        """
+        True if this process handles `user_id`'s reminders and jobs. Users are split into
+        SHARD_COUNT partitions by `user_id % SHARD_COUNT`, and a process owns the partitions
+        matching its SHARD_IDS (all of them without SHARD_IDS). Redundant processes running
+        the same shards then split those users through the coordinator's leases.
+        """
+        if SHARD_IDS is not None and user_id % SHARD_COUNT not in SHARD_IDS:
+            return False
+        return self.coordinator.owns(user_id)
+
+    def user_filter(self, field="_id"):
+        """Query fragment matching the users this process owns (see owns_user) on `field`."""
+        filters = []
+        if SHARD_IDS is not None:
+            if len(SHARD_IDS) == 1:
+                filters.append({field: {"$mod": [SHARD_COUNT, SHARD_IDS[0]]}})
+            else:
+                filters.append({"$or": [{field: {"$mod": [SHARD_COUNT, shard_id]}} for shard_id in SHARD_IDS]})
+        coordinated = self.coordinator.query_filter(field)
+        if coordinated:
+            filters.append(coordinated)
+        if len(filters) > 1:
+            return {"$and": filters}
+        return filters[0] if filters else {}
+
+    def _phase(self, name, started):
+        """Record and log how long a startup phase took."""
+        self.phases[name] = round(time.perf_counter() - started, 3)
+        print(f"Startup: {name} took {self.phases[name]:.2f}s")
+
+    def startup_report(self):
+        """Startup state, phase timings, per-cog results and cache stats, as served by the health endpoints."""
+        return {
+            "state": self.state, "phases": self.phases, "cogs": self.cog_report,
+            "coordination": self.coordinator.stats(),
+            "profile_cache": self.profiles.stats() if self.profiles else None,
+        }
+
+    async def _load_cog(self, name, lazy=False):
+        """Load one cog, recording its load time. Returns the error, if any."""
+        started = time.perf_counter()
         try:
-            guild = discord.Object(id=GUILD_ID)  # Use global GUILD_ID
-            synced = await self.tree.sync(guild=guild)
-            print(f'Synced {len(synced)} commands to guild {GUILD_ID}')
+            await self.load_extension(f'cogs.{name}')
         except Exception as e:
-            print(f'Error syncing commands: {e}')
+            error = getattr(e, "original", e)
+            self.cog_report[name] = {
+                "status": "failed", "seconds": round(time.perf_counter() - started, 3),
+                "lazy": lazy, "error": repr(error),
+            }
+            print(f"Failed to load cog {name}: {error}")
+            return error
+        self.cog_report[name] = {"status": "loaded", "seconds": round(time.perf_counter() - started, 3), "lazy": lazy}
+        return None
+
+    async def _connect_db(self):
+        started = time.perf_counter()
+        if await self.db.ping():
+            print("Connected to MongoDB!")
+            try:
+                await self.db.ensure_indexes()
+            except Exception as e:
+                print(f"Failed to create MongoDB indexes: {e}")
+        else:
+            print("MongoDB is not reachable yet; commands will retry on use.")
+        self._phase("DB connect", started)
+
+    async def _load_eager_cogs(self, names):
+        started = time.perf_counter()
+        errors = await asyncio.gather(*(self._load_cog(name) for name in names))
+        self._phase("cog load", started)
+        return [name for name, error in zip(names, errors) if error]
+
+    async def _finish_startup(self, lazy_names, guild):
+        """Load the lazy cogs, then sync slash commands, without holding up the gateway connection."""
+        started = time.perf_counter()
+        await asyncio.gather(*(self._load_cog(name, lazy=True) for name in lazy_names))
+        self._phase("lazy cog load", started)
+
+        # Sync slash commands, skipped when nothing changed since the last sync. With several
+        # shard processes only the one running shard 0 syncs.
+        if SHARD_IDS is None or 0 in SHARD_IDS:
+            started = time.perf_counter()
+            try:
+                await self.sync_commands(guild)
+            except Exception as e:
+                print(f'Error syncing commands: {e}')
+            self._phase("command sync", started)
+        self._lazy_done = True
+        self._update_state()
+
+    def _update_state(self):
+        if self.state == "failed" or not self._ready_logged or not self._lazy_done:
+            return
+        failed = [name for name, cog in self.cog_report.items() if cog["status"] == "failed"]
+        self.state = "degraded" if failed else "ready"
+        print(f"Startup report: {self.startup_report()}")
+
+    def command_tree_hash(self, guild):
+        """Stable hash of the slash commands registered for `guild` (None: global), as Discord would receive them."""
+        payload = sorted(
+            (command.to_dict(self.tree) for command in self.tree.get_commands(guild=guild)),
+            key=lambda command: command["name"]
+        )
+        target = guild.id if guild else "global"
+        serialized = json.dumps({"guild": target, "commands": payload}, sort_keys=True, default=str)
+        return hashlib.sha256(serialized.encode()).hexdigest()
+
+    async def sync_commands(self, guild):
+        """Sync slash commands only if they changed since the last sync (or when forced)."""
+        target = f"guild {guild.id}" if guild else "all guilds"
+        tree_hash = self.command_tree_hash(guild)
+        try:
+            with open(COMMAND_HASH_FILE) as f:
+                synced_hash = f.read().strip()
+        except OSError:
+            synced_hash = None
+
+        if tree_hash == synced_hash and not self.force_sync:
+            print(f"Commands unchanged since the last sync; skipping sync to {target}")
+            return
+
+        synced = await self.tree.sync(guild=guild)
+        print(f'Synced {len(synced)} commands to {target}')
+        try:
+            with open(COMMAND_HASH_FILE, "w") as f:
+                f.write(tree_hash)
+        except OSError as e:
+            print(f"Could not save the command tree hash: {e}")
+
+    async def setup_hook(self):
+        if self.health:
+            await self.health.start()
+
+        # Shared MongoDB layer, created inside the event loop so the pool binds to it
+        self.db = Database()
+        self.profiles = ProfileCache(self.db)
+        self.names = NameIndex(self.db)
+
+        # Join the instance group before cogs load their reminders, so they only load their share
+        await self.coordinator.start()
+
+        # Every .py in the 'cogs' folder is a cog; menu-only cogs can be loaded lazily
+        names = sorted(filename[:-3] for filename in os.listdir('./cogs') if filename.endswith('.py'))
+        lazy = [name for name in names if name in LAZY_COGS]
+        eager = [name for name in names if name not in LAZY_COGS]
+
+        # Connecting to MongoDB (ping + indexes) and loading the cogs are independent I/O
+        _, failed = await asyncio.gather(self._connect_db(), self._load_eager_cogs(eager))
+        if failed:
+            # A half-loaded bot would silently drop reminders; let the supervisor restart us
+            self.state = "failed"
+            print(f"Startup report: {self.startup_report()}")
+            raise RuntimeError(f"Failed to load cogs: {', '.join(failed)}")
+
+        # Cogs have loaded their reminders; start the shared scheduler and DM workers
+        self.dm_delivery.start()
+        self.scheduler.start()
+
+        self.state = "connecting"
+        self._lazy_task = asyncio.create_task(self._finish_startup(lazy, self.command_guild))
+
+    async def close(self):
+        self.scheduler.stop()
+        self.dm_delivery.stop()
+        self.charts.shutdown()
+        if self.db:
+            await self.coordinator.stop()
+        if self._lazy_task:
+            self._lazy_task.cancel()
+        await super().close()
+        if self.health:
+            await self.health.stop()
+        if self.db:
+            self.db.close()
 
     async def on_ready(self):
         print(f'{self.user} is logged in and active! Wassup! Wassup! Wassup!')
+        if not self._ready_logged:  # on_ready fires again after reconnects
+            self._ready_logged = True
+            self._phase("startup to gateway ready", self._started_at)
+            self._update_state()
 
 # Initialize and run the bot
 if __name__ == '__main__':
-    aurabot = AuraBot()
+    parser = argparse.ArgumentParser(description="Run AuraBot.")
+    parser.add_argument(
+        "--force-sync", action="store_true",
+        help="Sync slash commands even if they haven't changed since the last sync."
+    )
+    args = parser.parse_args()
+
+    aurabot = AuraBot(force_sync=args.force_sync)
     aurabot.run(TOKEN)
@@ -0,0 +1,180 @@
+import asyncio
+import logging
+from datetime import datetime, timezone
+import pytz
+
+# How many legacy documents the background migration moves per batch
+MIGRATION_BATCH_SIZE = 100
+
+def month_start(moment):
+    """First instant (UTC) of the month containing `moment`."""
+    moment = moment.astimezone(timezone.utc)
+    return datetime(moment.year, moment.month, 1, tzinfo=timezone.utc)
+
+class MoodStore:
+    """Mood entries stored in monthly buckets: one `mood_entries` document per user per UTC month.
+
+    Writes are a constant-size `$push` into the current month's bucket, and reads
+    only touch the buckets overlapping the requested time range. Each entry keeps
+    the local `timestamp` string shown to the user plus a UTC `logged_at` datetime.
+    """
+
+    # Set once migrate_legacy has emptied the legacy layout; nothing writes to it anymore
+    legacy_migrated = False
+
+    def __init__(self, db):
+        self.buckets = db.mood_entries
+        self.legacy = db.mood_logging
+        self.profiles = db.user_profiles
+
+    async def add(self, user_id, mood, now_local, score=None):
+        """Append one mood entry to the bucket of the month it was logged in."""
+        logged_at = now_local.astimezone(timezone.utc)
+        entry = {
+            "mood": mood,
+            "timestamp": now_local.strftime('%Y-%m-%d %H:%M:%S'),
+            "logged_at": logged_at,
+        }
+        if score is not None:
+            entry["score"] = score
+        await self.buckets.update_one(
+            {"user_id": user_id, "month": month_start(logged_at)},
+            {"$push": {"entries": entry}},
+            upsert=True
+        )
+
+    @staticmethod
+    def _bucket_query(user_id, start=None, end=None):
+        """Match the buckets overlapping [start, end)."""
+        month_filter = {}
+        if start:
+            month_filter["$gte"] = month_start(start)
+        if end:
+            month_filter["$lte"] = month_start(end)
+        query = {"user_id": user_id}
+        if month_filter:
+            query["month"] = month_filter
+        return query
+
+    @staticmethod
+    def _entries_in_range(start=None, end=None):
+        """Server-side expression for a bucket's entries logged in [start, end)."""
+        conditions = []
+        if start:
+            conditions.append({"$gte": ["$$entry.logged_at", start]})
+        if end:
+            conditions.append({"$lt": ["$$entry.logged_at", end]})
+        return {"$filter": {"input": "$entries", "as": "entry", "cond": {"$and": conditions}}}
+
+    async def entries(self, user_id, start=None, end=None):
+        """Yield entries logged in [start, end) in chronological order, one bucket at a time."""
+        query = self._bucket_query(user_id, start, end)
+        async for bucket in self.buckets.find(query, {"entries": 1}).sort("month", 1):
+            for entry in bucket["entries"]:
+                logged_at = entry["logged_at"].replace(tzinfo=timezone.utc)
+                if (start and logged_at < start) or (end and logged_at >= end):
+                    continue
+                yield entry
+
+    async def page(self, user_id, start=None, end=None, offset=0, limit=10):
+        """
+        One page of entries in [start, end), newest first, plus the total entry count.
+        Only per-bucket counts and the entries on the page leave the server.
+        """
+        in_range = self._entries_in_range(start, end)
+
+        # Per-bucket counts of matching entries, newest bucket first
+        counts = self.buckets.aggregate([
+            {"$match": self._bucket_query(user_id, start, end)},
+            {"$sort": {"month": -1}},
+            {"$project": {"count": {"$size": in_range}}},
+        ])
+        counts = [(bucket["_id"], bucket["count"]) async for bucket in counts if bucket["count"]]
+        total = sum(count for _, count in counts)
+
+        entries = []
+        for bucket_id, count in counts:
+            if offset >= count:
+                offset -= count  # Whole bucket is before this page
+                continue
+            take = min(limit - len(entries), count - offset)
+            docs = await self.buckets.aggregate([
+                {"$match": {"_id": bucket_id}},
+                {"$project": {"entries": {"$slice": [
+                    {"$sortArray": {"input": in_range, "sortBy": {"logged_at": -1}}}, offset, take
+                ]}}},
+            ]).to_list(1)
+            entries.extend(docs[0]["entries"] if docs else [])
+            offset = 0
+            if len(entries) >= limit:
+                break
+        return entries, total
+
+    async def migrate_user(self, user_id):
+        """Move a user's legacy `mood_logging.moods` array into buckets. Safe to re-run."""
+        if MoodStore.legacy_migrated:
+            return
+        # Park the array under another name so new log_mood calls can't race with it
+        legacy = await self.legacy.find_one_and_update(
+            {"_id": user_id, "moods": {"$exists": True}},
+            {"$rename": {"moods": "moods_migrating"}},
+            projection={"moods": 1}
+        )
+        if legacy is None:
+            legacy = await self.legacy.find_one(
+                {"_id": user_id, "moods_migrating": {"$exists": True}}, {"moods_migrating": 1}
+            )
+            if legacy is None:
+                return  # Nothing to migrate
+
+        moods = legacy.get("moods") or legacy.get("moods_migrating") or []
+        if moods:
+            profile = await self.profiles.find_one({"_id": user_id}, {"timezone": 1})
+            tz = pytz.timezone(profile.get("timezone", "UTC") if profile else "UTC")
+
+            # Legacy timestamps are naive local times; group them by UTC month
+            by_month = {}
+            for entry in moods:
+                local = tz.localize(datetime.strptime(entry["timestamp"], '%Y-%m-%d %H:%M:%S'))
+                logged_at = local.astimezone(timezone.utc)
+                by_month.setdefault(month_start(logged_at), []).append(
+                    {"mood": entry["mood"], "timestamp": entry["timestamp"], "logged_at": logged_at}
+                )
+
+            # $addToSet makes a retried migration a no-op for entries already moved
+            for month, month_entries in by_month.items():
+                await self.buckets.update_one(
+                    {"user_id": user_id, "month": month},
+                    {"$addToSet": {"entries": {"$each": month_entries}}},
+                    upsert=True
+                )
+
+        await self.legacy.update_one({"_id": user_id}, {"$unset": {"moods_migrating": ""}})
+
+    async def migrate_legacy(self):
+        """Background migration of every legacy document, one small batch at a time."""
+        query = {"$or": [{"moods": {"$exists": True}}, {"moods_migrating": {"$exists": True}}]}
+        migrated = failed = 0
+        last_id = None
+        while True:
+            # Page by _id so a user who fails to migrate is skipped instead of read again
+            page = {"$and": [query, {"_id": {"$gt": last_id}}]} if last_id is not None else query
+            batch = await self.legacy.find(page, {"_id": 1}).sort("_id", 1).limit(MIGRATION_BATCH_SIZE).to_list(None)
+            if not batch:
+                break
+            for doc in batch:
+                try:
+                    await self.migrate_user(doc["_id"])
+                    migrated += 1
+                except Exception as e:
+                    logging.error(f"Failed to migrate moods for user {doc['_id']}: {e}")
+                    failed += 1
+            last_id = batch[-1]["_id"]
+            await asyncio.sleep(0)  # Let commands run between batches
+        # Users that failed are still migrated on their next /viewmoods or export
+        if not failed:
+            MoodStore.legacy_migrated = True
+        if migrated:
+            logging.info(f"Migrated {migrated} legacy mood documents to monthly buckets.")
+        if failed:
+            logging.warning(f"{failed} legacy mood documents failed to migrate and were skipped.")
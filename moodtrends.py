@@ -0,0 +1,254 @@
+import calendar
+import logging
+from datetime import date, timedelta, timezone
+import numpy as np
+import pytz
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError
+from scheduler import utcnow
+
+# Days covered by /moodtrends
+TREND_WINDOW_DAYS = 365
+
+# Fewest scored days on each side before a habit correlation is reported
+MIN_CORRELATION_DAYS = 5
+
+# Scores for moods logged without one (1 = very low ... 5 = very good)
+MOOD_WORDS = {
+    1: ["awful", "terrible", "miserable", "depressed", "hopeless", "panicked", "horrible"],
+    2: ["sad", "down", "anxious", "stressed", "tired", "lonely", "angry", "upset", "bad", "low", "overwhelmed"],
+    3: ["ok", "okay", "fine", "meh", "neutral", "alright", "calm"],
+    4: ["good", "content", "relaxed", "hopeful", "productive", "focused", "motivated"],
+    5: ["great", "happy", "amazing", "excited", "fantastic", "joyful", "awesome", "energized"],
+}
+_WORD_SCORES = {word: score for score, words in MOOD_WORDS.items() for word in words}
+
+# Users checked against the backfill markers per query
+BACKFILL_BATCH_SIZE = 500
+
+# Arrays kept per user per year; day arrays are indexed by local day-of-year - 1
+DAY_FIELDS = ("day_sum", "day_count", "day_logs")
+HOUR_FIELDS = ("hour_sum", "hour_count")
+WEEKDAYS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+
+def mood_score(mood):
+    """Score for a free-text mood from MOOD_WORDS, or None if no word is known."""
+    scores = [_WORD_SCORES[word] for word in mood.lower().replace(",", " ").split() if word in _WORD_SCORES]
+    return round(sum(scores) / len(scores)) if scores else None
+
+def _days_in(year):
+    return 366 if calendar.isleap(year) else 365
+
+def _empty_arrays():
+    arrays = {field: [0] * 366 for field in DAY_FIELDS}
+    arrays.update({field: [0] * 24 for field in HOUR_FIELDS})
+    return arrays
+
+def _increments(local_time, score):
+    """Array positions a mood logged at `local_time` adds to, as "field.index" -> amount."""
+    day = local_time.timetuple().tm_yday - 1
+    inc = {f"day_logs.{day}": 1}
+    if score is not None:
+        inc.update({
+            f"day_sum.{day}": score, f"day_count.{day}": 1,
+            f"hour_sum.{local_time.hour}": score, f"hour_count.{local_time.hour}": 1,
+        })
+    return inc
+
+class MoodRollups:
+    """Per-user, per-year mood rollups in `mood_rollups`, maintained incrementally.
+
+    Each document holds fixed-size arrays (daily score sums, scored counts and log
+    counts by local day-of-year, score sums and counts by local hour), updated with
+    one `$inc` per logged mood. Entries logged before rollups existed, or imported,
+    are folded into a separate `hist` copy of the arrays by `backfill_user`, which
+    `$set`s absolute values and so is safe to re-run.
+    """
+
+    def __init__(self, db):
+        self.rollups = db.mood_rollups
+        self.buckets = db.mood_entries
+        self.profiles = db.user_profiles
+        self.backfills = db.mood_backfills  # {_id: user id, backfilled_at}
+
+    async def start(self):
+        """Record when live rollups began; entries before that are the backfill's."""
+        meta = await self.rollups.find_one_and_update(
+            {"_id": "meta"}, {"$setOnInsert": {"since": utcnow()}},
+            upsert=True, return_document=ReturnDocument.AFTER
+        )
+        self.since = meta["since"].replace(tzinfo=timezone.utc)
+
+    async def add(self, user_id, local_time, score):
+        """Count one mood logged at `local_time` (aware, user's timezone) with an optional score."""
+        query = {"user_id": user_id, "year": local_time.year}
+        result = await self.rollups.update_one(query, {"$inc": _increments(local_time, score)})
+        if result.matched_count:
+            return
+        # First mood of the year: create the zeroed arrays, then count it
+        try:
+            await self.rollups.insert_one(dict(query, **_empty_arrays()))
+        except DuplicateKeyError:
+            pass  # Created concurrently
+        await self.rollups.update_one(query, {"$inc": _increments(local_time, score)})
+
+    async def load(self, user_id, first_year, last_year):
+        """Rollup documents for the given years, by year."""
+        docs = self.rollups.find(
+            {"user_id": user_id, "year": {"$gte": first_year, "$lte": last_year}}, {"_id": 0, "user_id": 0}
+        )
+        return {doc["year"]: doc async for doc in docs}
+
+    async def backfill_user(self, user_id):
+        """Fold a user's entries logged before `since`, and any imported by /importdata, into the `hist` arrays."""
+        profile = await self.profiles.find_one({"_id": user_id}, {"timezone": 1})
+        try:
+            tz = pytz.timezone((profile or {}).get("timezone") or "UTC")
+        except pytz.UnknownTimeZoneError:
+            tz = pytz.utc
+
+        years = {}
+        pipeline = [
+            {"$match": {"user_id": user_id, "$or": [{"month": {"$lt": self.since}}, {"entries.imported": True}]}},
+            {"$unwind": "$entries"},
+            {"$match": {"$or": [{"entries.logged_at": {"$lt": self.since}}, {"entries.imported": True}]}},
+            {"$project": {"_id": 0, "mood": "$entries.mood", "score": "$entries.score", "logged_at": "$entries.logged_at"}},
+        ]
+        async for entry in self.buckets.aggregate(pipeline):
+            local_time = entry["logged_at"].replace(tzinfo=timezone.utc).astimezone(tz)
+            score = entry.get("score")
+            if score is None:
+                score = mood_score(entry["mood"])
+            arrays = years.setdefault(local_time.year, _empty_arrays())
+            for path, amount in _increments(local_time, score).items():
+                field, index = path.split(".")
+                arrays[field][int(index)] += amount
+
+        for year, arrays in years.items():
+            query = {"user_id": user_id, "year": year}
+            result = await self.rollups.update_one(query, {"$set": {"hist": arrays}})
+            if not result.matched_count:
+                try:
+                    await self.rollups.insert_one(dict(query, hist=arrays, **_empty_arrays()))
+                except DuplicateKeyError:
+                    await self.rollups.update_one(query, {"$set": {"hist": arrays}})
+        await self.backfills.update_one({"_id": user_id}, {"$set": {"backfilled_at": utcnow()}}, upsert=True)
+
+    async def _convert_legacy_markers(self):
+        # Progress used to be one ever-growing array on the meta document
+        meta = await self.rollups.find_one({"_id": "meta", "backfilled": {"$exists": True}}, {"backfilled": 1})
+        if meta:
+            now = utcnow()
+            users = meta["backfilled"]
+            for start in range(0, len(users), BACKFILL_BATCH_SIZE):
+                await self.backfills.bulk_write([
+                    UpdateOne({"_id": user_id}, {"$setOnInsert": {"backfilled_at": now}}, upsert=True)
+                    for user_id in users[start:start + BACKFILL_BATCH_SIZE]
+                ], ordered=False)
+            await self.rollups.update_one({"_id": "meta"}, {"$unset": {"backfilled": ""}})
+
+    async def backfill(self):
+        """Background backfill for every user with mood history from before rollups existed."""
+        await self._convert_legacy_markers()
+        user_ids = await self.buckets.distinct("user_id", {"month": {"$lt": self.since}})
+        for start in range(0, len(user_ids), BACKFILL_BATCH_SIZE):
+            batch = user_ids[start:start + BACKFILL_BATCH_SIZE]
+            done = {doc["_id"] async for doc in self.backfills.find({"_id": {"$in": batch}}, {"_id": 1})}
+            for user_id in batch:
+                if user_id in done:
+                    continue
+                try:
+                    await self.backfill_user(user_id)
+                except Exception as e:
+                    # Markers make a later run pick up only the users still missing
+                    logging.error(f"Failed to backfill mood rollups for user {user_id}: {e}")
+
+def _series(docs, first_year, last_year, field):
+    """One array over consecutive days (or hours), summing the live and backfilled arrays."""
+    parts = []
+    for year in range(first_year, last_year + 1):
+        doc = docs.get(year, {})
+        length = 24 if field in HOUR_FIELDS else _days_in(year)
+        values = np.zeros(length)
+        for source in (doc, doc.get("hist", {})):
+            if field in source:
+                values += np.asarray(source[field][:length], dtype=float)
+        parts.append(values)
+    return np.concatenate(parts) if field in DAY_FIELDS else np.sum(parts, axis=0)
+
+def _daylog_series(daylog, first_year, last_year):
+    """0/1 array of a DayLog over consecutive days, unpacked from its per-year bitsets."""
+    parts = []
+    for year in range(first_year, last_year + 1):
+        bits = daylog.years.get(year, 0)
+        raw = np.frombuffer(bits.to_bytes(48, "little"), dtype=np.uint8)
+        parts.append(np.unpackbits(raw, bitorder="little")[:_days_in(year)].astype(float))
+    return np.concatenate(parts)
+
+def _mean(sums, counts):
+    total = counts.sum()
+    return float(sums.sum() / total) if total else None
+
+def daily_series(docs, today, days):
+    """(start date, score sums, scored counts, log counts) arrays for the `days` days ending `today`."""
+    start = today - timedelta(days=days - 1)
+    offset = (start - date(start.year, 1, 1)).days
+    window = slice(offset, offset + days)
+    return start, *(_series(docs, start.year, today.year, field)[window] for field in DAY_FIELDS)
+
+def compute_trends(docs, habits, today):
+    """
+    Trends over the TREND_WINDOW_DAYS days ending `today` from rollup documents by year
+    and a {habit name: DayLog} map, all with NumPy array operations.
+    """
+    start, sums, counts, logs = daily_series(docs, today, TREND_WINDOW_DAYS)
+    first_year, last_year = start.year, today.year
+    window = slice((start - date(first_year, 1, 1)).days, None)
+
+    trends = {
+        "days_logged": int(np.count_nonzero(logs)),
+        "moods_logged": int(logs.sum()),
+        "scored_days": int(np.count_nonzero(counts)),
+        "average": _mean(sums, counts),
+        "last_7": _mean(sums[-7:], counts[-7:]),
+        "previous_7": _mean(sums[-14:-7], counts[-14:-7]),
+        "last_30": _mean(sums[-30:], counts[-30:]),
+    }
+
+    # Weekday pattern: fold the window onto weekdays by day index
+    weekdays = (np.arange(TREND_WINDOW_DAYS) + start.weekday()) % 7
+    weekday_sums = np.bincount(weekdays, weights=sums, minlength=7)
+    weekday_counts = np.bincount(weekdays, weights=counts, minlength=7)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        weekday_means = weekday_sums / weekday_counts
+    trends["weekdays"] = {
+        WEEKDAYS[i]: round(float(weekday_means[i]), 2) for i in range(7) if weekday_counts[i]
+    }
+
+    # Hour-of-day pattern across the years loaded
+    hour_sums = _series(docs, first_year, last_year, "hour_sum")
+    hour_counts = _series(docs, first_year, last_year, "hour_count")
+    with np.errstate(invalid="ignore", divide="ignore"):
+        hour_means = hour_sums / hour_counts
+    trends["hours"] = {hour: round(float(hour_means[hour]), 2) for hour in range(24) if hour_counts[hour]}
+
+    # Habit correlation: average score on days the habit was done vs. not done
+    scored = counts > 0
+    with np.errstate(invalid="ignore", divide="ignore"):
+        daily = np.where(scored, sums / counts, np.nan)
+    correlations = {}
+    for name, daylog in habits.items():
+        done = _daylog_series(daylog, first_year, last_year)[window][:TREND_WINDOW_DAYS]
+        with_habit, without_habit = scored & (done > 0), scored & (done == 0)
+        if with_habit.sum() < MIN_CORRELATION_DAYS or without_habit.sum() < MIN_CORRELATION_DAYS:
+            continue
+        r = np.corrcoef(done[scored], daily[scored])[0, 1]
+        if np.isnan(r):
+            continue  # Every scored day had the same score
+        correlations[name] = {
+            "with": round(float(daily[with_habit].mean()), 2),
+            "without": round(float(daily[without_habit].mean()), 2),
+            "r": round(float(r), 2),
+        }
+    trends["habits"] = correlations
+    return trends
@@ -0,0 +1,67 @@
+from cache import TTLCache
+from config import NAME_INDEX_CACHE_SIZE, NAME_INDEX_CACHE_TTL_SECONDS
+
+# kind -> (source collection, name field inside its array of the same name)
+SOURCES = {
+    "goals": ("goal_tracking", "goal"),
+    "habits": ("habit_tracking", "habit"),
+}
+
+class NameIndex:
+    """Per-user lists of goal and habit names for autocomplete.
+
+    One small `name_index` document per user ({_id, goals: [...], habits: [...]})
+    is kept up to date by the commands that add or remove items, so autocomplete
+    never loads the goal/habit documents with their day logs. A user whose index
+    predates this is rebuilt once from a names-only projection of the source.
+    """
+
+    def __init__(self, db, maxsize=NAME_INDEX_CACHE_SIZE, ttl=NAME_INDEX_CACHE_TTL_SECONDS):
+        self.db = db
+        self.collection = db.name_index
+        self._names = TTLCache(maxsize, ttl)  # (user id, kind) -> list of names
+
+    async def names(self, user_id, kind):
+        """All of the user's names of this kind, in insertion order."""
+        cached = self._names.get((user_id, kind))
+        if cached is not None:
+            return cached
+
+        doc = await self.collection.find_one({"_id": user_id}, {kind: 1})
+        if doc is not None and kind in doc:
+            names = doc[kind]
+        else:
+            names = await self._rebuild(user_id, kind)
+        self._names.set((user_id, kind), names)
+        return names
+
+    async def _rebuild(self, user_id, kind):
+        source, field = SOURCES[kind]
+        doc = await getattr(self.db, source).find_one({"_id": user_id}, {f"{kind}.{field}": 1})
+        names = list(dict.fromkeys(item[field] for item in (doc or {}).get(kind, []) if field in item))
+        await self.collection.update_one({"_id": user_id}, {"$set": {kind: names}}, upsert=True)
+        return names
+
+    async def search(self, user_id, kind, text, limit=25):
+        """Names starting with `text` first, then names containing it (case-insensitive)."""
+        text = text.strip().lower()
+        names = await self.names(user_id, kind)
+        starts = [name for name in names if name.lower().startswith(text)]
+        contains = [name for name in names if text in name.lower() and name not in starts]
+        return (starts + contains)[:limit]
+
+    async def add(self, user_id, kind, name):
+        await self.add_all(user_id, kind, [name])
+
+    async def add_all(self, user_id, kind, names):
+        await self.names(user_id, kind)  # Make sure the index exists before adding to it
+        await self.collection.update_one({"_id": user_id}, {"$addToSet": {kind: {"$each": list(names)}}}, upsert=True)
+        self._names.pop((user_id, kind))
+
+    async def remove(self, user_id, kind, names):
+        await self.collection.update_one({"_id": user_id}, {"$pullAll": {kind: list(names)}})
+        self._names.pop((user_id, kind))
+
+    async def clear(self, user_id, kind):
+        await self.collection.update_one({"_id": user_id}, {"$set": {kind: []}}, upsert=True)
+        self._names.pop((user_id, kind))
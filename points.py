@@ -0,0 +1,107 @@
+from datetime import datetime, timedelta, timezone
+from pymongo import ReturnDocument
+from scheduler import utcnow
+
+# Points awarded per day of goal progress
+PROGRESS_AWARD = 5
+
+# Inactivity decay: a goal with no progress for a full day costs this many points
+# per hour from then on, until progress is logged or the goal is deleted
+DECAY_PER_HOUR = 1
+DECAY_GRACE = timedelta(days=1)
+
+def goal_decay(goal, now=None):
+    """Points of inactivity decay a single goal has accrued since its last progress."""
+    last_update = goal.get("last_update")
+    if not last_update:
+        return 0
+    now = now or utcnow()
+    stale_since = datetime.strptime(last_update, "%Y-%m-%d").replace(tzinfo=timezone.utc) + DECAY_GRACE
+    if now < stale_since:
+        return 0
+    return (int((now - stale_since).total_seconds() // 3600) + 1) * DECAY_PER_HOUR
+
+class PointsLedger:
+    """Point balances with an append-only ledger of every change.
+
+    The stored `points` field only changes through atomic updates in `record`.
+    Inactivity decay is never written on a timer. It is derived from each goal's
+    `last_update` when a balance is read, and it is settled into the ledger when
+    that goal's `last_update` changes or the goal is removed.
+    """
+
+    def __init__(self, db):
+        self.balances = db.goal_tracking
+        self.ledger = db.points_ledger
+
+    async def record(self, user_id, events):
+        """
+        Apply (amount, reason, goal) events in order as one atomic update, never letting the
+        stored points drop below zero, and append them to the ledger. Returns the new balance.
+        """
+        projection = {"points": 1, "goals.goal": 1, "goals.last_update": 1}
+        events = [event for event in events if event[0]]
+        if not events:
+            return await self.current_balance(user_id)
+
+        points = {"$ifNull": ["$points", 0]}
+        for amount, _, _ in events:
+            points = {"$max": [0, {"$add": [points, amount]}]}
+        user = await self.balances.find_one_and_update(
+            {"_id": user_id},
+            [{"$set": {"points": points}}],
+            projection=projection,
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+
+        now = utcnow()
+        await self.ledger.insert_many([
+            {"user_id": user_id, "amount": amount, "reason": reason, "goal": goal, "at": now}
+            for amount, reason, goal in events
+        ])
+        return self.balance(user)
+
+    async def award_progress(self, user_id, goal_before):
+        """Settle the goal's decay up to now, then award progress points. Returns the new balance."""
+        name = goal_before.get("goal")
+        return await self.record(user_id, [
+            (-goal_decay(goal_before), "inactivity", name),
+            (PROGRESS_AWARD, "goal_progress", name),
+        ])
+
+    async def settle_removed(self, user_id, removed_goals):
+        """Settle the decay of goals that are being deleted, so it isn't forgotten with them."""
+        await self.record(user_id, [
+            (-goal_decay(goal), "inactivity", goal.get("goal")) for goal in removed_goals
+        ])
+
+    async def current_balance(self, user_id, now=None):
+        """The user's balance, reading only `points` and the last_update of goals that can be decaying."""
+        now = now or utcnow()
+        # A goal only decays once a full day has passed since its last_update
+        stale_through = (now - DECAY_GRACE).strftime("%Y-%m-%d")
+        stale = {"$filter": {
+            "input": {"$ifNull": ["$goals", []]},
+            "as": "goal",
+            "cond": {"$and": [
+                {"$gt": ["$$goal.last_update", None]},
+                {"$lte": ["$$goal.last_update", stale_through]},
+            ]},
+        }}
+        pipeline = [
+            {"$match": {"_id": user_id}},
+            {"$project": {"_id": 0, "points": 1, "goals": {"$map": {
+                "input": stale, "as": "goal", "in": {"last_update": "$$goal.last_update"}
+            }}}},
+        ]
+        docs = await self.balances.aggregate(pipeline).to_list(1)
+        return self.balance(docs[0] if docs else None, now)
+
+    @staticmethod
+    def balance(user_data, now=None):
+        """Current balance: stored points minus the decay still pending on every goal."""
+        if not user_data:
+            return 0
+        pending = sum(goal_decay(goal, now) for goal in user_data.get("goals", []))
+        return max(user_data.get("points", 0) - pending, 0)
@@ -0,0 +1,139 @@
+import asyncio
+import heapq
+import itertools
+import logging
+from datetime import datetime, timedelta, timezone
+from config import REMINDER_CONCURRENCY
+
+# How long a reminder whose handler failed waits before it is tried again
+RETRY_DELAY = timedelta(minutes=1)
+
+def utcnow():
+    """Timezone-aware current UTC time."""
+    return datetime.now(timezone.utc)
+
+def next_daily_utc(reminder_time, now=None):
+    """Next UTC datetime matching an "HH:MM" time of day interpreted in UTC."""
+    now = now or utcnow()
+    hour, minute = map(int, reminder_time.split(":"))
+    fire_at = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    if fire_at <= now:
+        fire_at += timedelta(days=1)
+    return fire_at
+
+class ReminderScheduler:
+    """Single in-memory timer queue shared by every reminder in the bot.
+
+    Each entry is identified by a tuple key whose first element is the reminder
+    kind, e.g. ("habit", user_id, habit_name), and is ordered by its next UTC fire
+    time. Cogs register one handler per kind; the handler is called with the key
+    when it is due and returns the next fire time, or None to drop the entry.
+    A handler that raises is retried after RETRY_DELAY.
+    The loop sleeps until the earliest entry is due, so idle reminders cost nothing;
+    entries due together are fired concurrently, at most REMINDER_CONCURRENCY at a time.
+    """
+
+    def __init__(self, aurabot):
+        self.aurabot = aurabot
+        self._heap = []  # (fire_at, seq, key)
+        self._live = {}  # key -> seq of its current heap item; older items are stale
+        self._fire_at = {}  # key -> fire time of its current heap item
+        self._by_user = {}  # (kind, user_id) -> set of keys, for per-user cancellation
+        self._handlers = {}
+        self._seq = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._slots = asyncio.Semaphore(REMINDER_CONCURRENCY)
+        self._task = None
+
+    def __len__(self):
+        return len(self._live)
+
+    def register(self, kind, handler):
+        """Register the coroutine handling reminders of `kind`."""
+        self._handlers[kind] = handler
+
+    def unregister(self, kind):
+        """Remove a handler and every pending entry of that kind."""
+        self._handlers.pop(kind, None)
+        for key in [key for key in self._live if key[0] == kind]:
+            self.cancel(key)
+
+    def schedule(self, key, fire_at):
+        """
+        Add or move an entry. Rescheduling an existing key replaces its fire time;
+        rescheduling it to the time it already has does nothing.
+        """
+        if self._fire_at.get(key) == fire_at and key in self._live:
+            return
+        seq = next(self._seq)
+        self._live[key] = seq
+        self._fire_at[key] = fire_at
+        if len(key) > 1:
+            self._by_user.setdefault((key[0], key[1]), set()).add(key)
+        heapq.heappush(self._heap, (fire_at, seq, key))
+        if self._heap[0][1] == seq:
+            self._wakeup.set()  # New earliest entry, recompute the sleep
+
+    def cancel(self, key):
+        """Drop an entry. Its heap item is discarded lazily when it reaches the top."""
+        self._fire_at.pop(key, None)
+        if self._live.pop(key, None) is not None and len(key) > 1:
+            user_keys = self._by_user.get((key[0], key[1]))
+            if user_keys is not None:
+                user_keys.discard(key)
+                if not user_keys:
+                    del self._by_user[(key[0], key[1])]
+
+    def cancel_user(self, kind, user_id):
+        """Drop every entry of `kind` belonging to one user."""
+        for key in list(self._by_user.get((kind, user_id), ())):
+            self.cancel(key)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def _pop_due(self, now):
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            _, seq, key = heapq.heappop(self._heap)
+            if self._live.get(key) != seq:
+                continue  # Cancelled or rescheduled since this item was pushed
+            self.cancel(key)
+            due.append(key)
+        return due
+
+    async def _fire(self, key):
+        handler = self._handlers.get(key[0])
+        if handler is None:
+            return
+        try:
+            async with self._slots:
+                next_fire = await handler(key)
+        except Exception as e:
+            logging.error(f"Error running reminder {key}, retrying in {RETRY_DELAY}: {e}")
+            next_fire = utcnow() + RETRY_DELAY
+        # The handler may have scheduled the key itself (e.g. after a command update)
+        if next_fire is not None and key not in self._live:
+            self.schedule(key, next_fire)
+
+    async def _run(self):
+        await self.aurabot.wait_until_ready()
+        while not self.aurabot.is_closed():
+            self._wakeup.clear()
+            due = self._pop_due(utcnow())
+            if due:
+                await asyncio.gather(*(self._fire(key) for key in due))
+
+            timeout = None
+            if self._heap:
+                timeout = max((self._heap[0][0] - utcnow()).total_seconds(), 0)
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
@@ -0,0 +1,96 @@
+from datetime import datetime, timedelta
+from daylog import DATE_FORMAT, DayLog
+
+# Counters kept on every habit and goal under "stats":
+#   current: consecutive days up to `last`   longest: best run ever
+#   total:   days logged                     last:    most recent logged day ("%Y-%m-%d")
+EMPTY_STATS = {"current": 0, "longest": 0, "total": 0, "last": None}
+
+def stats_from_daylog(log):
+    """Compute the counters from a full DayLog. Used once per item to seed them."""
+    stats = dict(EMPTY_STATS)
+    for day in log:
+        stats = advance(stats, day)
+    return stats
+
+def advance(stats, day):
+    """Counters after logging `day`, which must not be earlier than stats["last"]."""
+    day_text = day.strftime(DATE_FORMAT)
+    last = stats.get("last")
+    if last == day_text:
+        return stats
+    yesterday = (day - timedelta(days=1)).strftime(DATE_FORMAT)
+    current = stats.get("current", 0) + 1 if last == yesterday else 1
+    return {
+        "current": current,
+        "longest": max(stats.get("longest", 0), current),
+        "total": stats.get("total", 0) + 1,
+        "last": day_text,
+    }
+
+def item_stats(item):
+    """An item's stored counters, seeding them from its day log if it predates them."""
+    if item.get("stats"):
+        return item["stats"]
+    return stats_from_daylog(DayLog.from_document(item.get("days"), item.get("logs", item.get("progress"))))
+
+async def item_summaries(collection, user_id, array, fields, legacy_field, extra=()):
+    """
+    The user's document with only `fields` and the stats of each item in `array`, plus
+    any top-level `extra` fields. Built server-side, so the reply stays small however
+    long the items have been logged; the day log is only sent for an item without
+    stored counters, for item_stats to seed them.
+    """
+    item = {field: f"$$item.{field}" for field in fields}
+    item["stats"] = "$$item.stats"
+    for field in ("days", legacy_field):
+        item[field] = {"$cond": [{"$ifNull": ["$$item.stats", False]}, "$$REMOVE", f"$$item.{field}"]}
+    pipeline = [
+        {"$match": {"_id": user_id}},
+        {"$project": {
+            "_id": 0,
+            array: {"$map": {"input": {"$ifNull": [f"${array}", []]}, "as": "item", "in": item}},
+            **{field: 1 for field in extra},
+        }},
+    ]
+    docs = await collection.aggregate(pipeline).to_list(1)
+    return docs[0] if docs else None
+
+def current_streak(stats, today):
+    """The current streak as of `today`; a streak whose last day is before yesterday is broken."""
+    last = stats.get("last")
+    if not last:
+        return 0
+    if (today - datetime.strptime(last, DATE_FORMAT).date()).days > 1:
+        return 0
+    return stats.get("current", 0)
+
+def format_stats(stats, today):
+    return (
+        f"Streak: {current_streak(stats, today)} (best {stats.get('longest', 0)}) | "
+        f"Last: {stats.get('last') or 'never'}"
+    )
+
+async def reset_broken_streaks(collection, array, today, match=None):
+    """Zero `current` on every item not logged today or yesterday, in one server-side update."""
+    yesterday = (today - timedelta(days=1)).strftime(DATE_FORMAT)
+    await collection.update_many(
+        {f"{array}.stats.last": {"$lt": yesterday}, **(match or {})},
+        {"$set": {f"{array}.$[item].stats.current": 0}},
+        array_filters=[{"item.stats.last": {"$lt": yesterday}, "item.stats.current": {"$gt": 0}}]
+    )
+
+async def backfill_stats(collection, array, name_field):
+    """Seed counters for items logged before they existed. Runs once per item."""
+    seeded = 0
+    query = {array: {"$elemMatch": {"stats": {"$exists": False}}}}
+    async for doc in collection.find(query, {f"{array}.{name_field}": 1, f"{array}.stats": 1, f"{array}.days": 1}):
+        for item in doc.get(array, []):
+            if "stats" in item:
+                continue
+            await collection.update_one(
+                {"_id": doc["_id"], array: {"$elemMatch": {name_field: item[name_field], "stats": {"$exists": False}}}},
+                {"$set": {f"{array}.$.stats": item_stats(item)}}
+            )
+            seeded += 1
+    return seeded
@@ -0,0 +1,50 @@
+import bisect
+from datetime import timezone
+import pytz
+from scheduler import utcnow
+
+MINUTES_PER_DAY = 24 * 60
+
+def next_offset_change(tz, now=None):
+    """UTC datetime of the next UTC-offset transition in `tz`, or None for fixed-offset zones."""
+    now = now or utcnow()
+    transitions = getattr(tz, "_utc_transition_times", None)
+    if not transitions:
+        return None
+    # pytz stores transitions as naive UTC datetimes in ascending order
+    i = bisect.bisect_right(transitions, now.astimezone(timezone.utc).replace(tzinfo=None))
+    if i >= len(transitions):
+        return None
+    return transitions[i].replace(tzinfo=timezone.utc)
+
+def compute_slot(reminder_time, tz, now=None):
+    """
+    Convert a local "HH:MM" reminder into a UTC minute-of-day slot.
+    Returns (slot, expires_at); the slot stays valid until the zone's next offset change.
+    """
+    now = now or utcnow()
+    hour, minute = map(int, reminder_time.split(":"))
+    offset = now.astimezone(tz).utcoffset()
+    offset_minutes = int(offset.total_seconds() // 60)
+    slot = (hour * 60 + minute - offset_minutes) % MINUTES_PER_DAY
+    return slot, next_offset_change(tz, now)
+
+def slot_fields(reminder_time, timezone_name, now=None):
+    """The mood_logging fields stored next to a reminder time."""
+    slot, expires_at = compute_slot(reminder_time, pytz.timezone(timezone_name), now)
+    return {
+        "reminder_time": reminder_time,
+        "reminder_timezone": timezone_name,
+        "reminder_slot": slot,
+        "reminder_slot_expires": expires_at,
+    }
+
+async def refresh_mood_slot(mood_collection, user_id, timezone_name):
+    """Recompute a user's mood reminder slot after their timezone changed."""
+    user = await mood_collection.find_one({"_id": user_id}, {"reminder_time": 1})
+    if not user or not user.get("reminder_time"):
+        return
+    await mood_collection.update_one(
+        {"_id": user_id},
+        {"$set": slot_fields(user["reminder_time"], timezone_name)}
+    )
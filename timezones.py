@@ -0,0 +1,74 @@
+from bisect import bisect_left
+import pytz
+
+# Shown when the user hasn't typed anything yet
+POPULAR_TIMEZONES = [
+    "UTC", "US/Eastern", "US/Central", "US/Mountain", "US/Pacific", "US/Alaska", "US/Hawaii",
+    "America/Sao_Paulo", "Europe/London", "Europe/Paris", "Europe/Berlin", "Africa/Lagos",
+    "Asia/Kolkata", "Asia/Shanghai", "Asia/Tokyo", "Australia/Sydney", "Pacific/Auckland",
+]
+
+def _normalize(text):
+    return " ".join(text.lower().replace("_", " ").replace("/", " / ").split())
+
+class TimezoneIndex:
+    """Prefix index over every IANA zone name, alias and city, built once.
+
+    Each zone is indexed under its full name ("America/New_York"), every path
+    segment ("New_York", "Argentina/Buenos_Aires" -> "Buenos_Aires"), and the
+    names of the countries that use it. Keys live in one sorted list, so a
+    lookup is a bisect plus a short scan of the matching run.
+    """
+
+    def __init__(self, zones=None):
+        zones = list(zones or pytz.all_timezones)
+        self._canonical = {zone.lower(): zone for zone in zones}
+        keys = set()
+        for zone in zones:
+            keys.add((_normalize(zone), zone))
+            parts = zone.split("/")
+            for i in range(1, len(parts)):
+                keys.add((_normalize("/".join(parts[i:])), zone))
+        for code, country_zones in pytz.country_timezones.items():
+            country = _normalize(pytz.country_names.get(code, code))
+            for zone in country_zones:
+                if zone.lower() in self._canonical:
+                    keys.add((country, zone))
+        self._keys = sorted(keys)
+        self._popular = [zone for zone in POPULAR_TIMEZONES if zone.lower() in self._canonical]
+
+    def __len__(self):
+        return len(self._canonical)
+
+    def search(self, text, limit=25):
+        """Up to `limit` zone names whose name, city or country starts with `text`."""
+        prefix = _normalize(text)
+        if not prefix:
+            return self._popular[:limit]
+
+        results = []
+        exact = self._canonical.get(text.strip().lower())
+        if exact:
+            results.append(exact)
+        i = bisect_left(self._keys, (prefix, ""))
+        while i < len(self._keys) and len(results) < limit:
+            key, zone = self._keys[i]
+            if not key.startswith(prefix):
+                break
+            if zone not in results:
+                results.append(zone)
+            i += 1
+        return results
+
+    def resolve(self, text):
+        """The zone `text` names (case-insensitive, or a unique city/country), else None."""
+        if not text:
+            return None
+        exact = self._canonical.get(text.strip().lower())
+        if exact:
+            return exact
+        matches = self.search(text, limit=2)
+        return matches[0] if len(matches) == 1 else None
+
+# Built at import, i.e. once at startup when the profile cog loads
+timezone_index = TimezoneIndex()